@@ -108,7 +108,7 @@
 
 from crewai import Agent, Task, Crew, Process
 from crewai import LLM
-from crewai_tools import PDFSearchTool, SerperDevTool
+from crewai_tools import SerperDevTool
 
 # %% [markdown]
 # ---
@@ -174,7 +174,7 @@ llm = LLM(
 # 
 # Our chatbot needs to access information from two sources: Daily Dish's FAQ PDF and the general internet. To do this, we'll instantiate two tools.
 # 
-# 1.  **`PDFSearchTool`**: This tool, from the `crewai_tools` library, will index the provided PDF document. When used, it performs a semantic search to find the most relevant sections of the PDF related to a query.
+# 1.  **FAQ search tool**: This tool indexes the provided PDF document. When used, it performs a semantic search to find the most relevant sections of the PDF related to a query. It takes the same `query` argument as `PDFSearchTool` from the `crewai_tools` library, but reads a prebuilt index, as described below.
 # 2.  **`SerperDevTool`**: This simple tool from `crewai_tools` allows an agent to perform a web search using SerperAPI.
 # 
 # 
@@ -193,28 +193,67 @@ llm = LLM(
 import os
 os.environ['SERPER_API_KEY'] = 'API_KEY' 
 
+# %% [markdown]
+# The chatbot answers many similar questions, and each web search costs time and API quota. `make_cached_search_tool` from `search_cache.py` builds a `SerperDevTool` whose results are kept in `search_cache.sqlite`, keyed on the normalized query, so a question searched before is answered from disk. Results expire after an hour for news, six hours for prices and a week for other queries; an expired result is still served while it is refreshed in the background.
+# 
+
 # %%
-web_search_tool = SerperDevTool()
+from search_cache import PersistentSearchCache, make_cached_search_tool
+
+search_cache = PersistentSearchCache("search_cache.sqlite")
+web_search_tool = make_cached_search_tool(search_cache)
 
 # %% [markdown]
 # ### Creating our PDF Search Tool: 
 # 
+# `PDFSearchTool` from `crewai_tools` downloads, chunks and embeds the FAQ every time the chatbot starts, which takes most of its start-up time. `build_index` from `faq_index.py` does that work once and writes the chunks, their vectors and the PDF's hash to `faq_index.bin`. The vectors are stored as int8, which takes a quarter of the space of float32 with almost the same search results. On later starts it only checks the hash and memory-maps the file, and it rebuilds the index only when the PDF or the embedding model changes. `make_faq_search_tool` wraps the index in a tool that takes the same `query` argument as `PDFSearchTool` and uses the same all-MiniLM-L6-v2 embeddings.
+# 
 
 # %%
 import warnings
 warnings.filterwarnings('ignore') #Keeps Jupyter Notebook clean (not part of functionality)
 
-pdf_search_tool = PDFSearchTool(
-    pdf="https://cf-courses-data.s3.us.cloud-object-storage.appdomain.cloud/7vgNfis17dQfjHAiIKkBOg/The-Daily-Dish-FAQ.pdf",
-    config=dict(
-        embedder=dict(
-            provider="huggingface",
-            config=dict(
-                model="sentence-transformers/all-MiniLM-L6-v2"
-            )
-        )
-    )
+from faq_index import FAQ_PDF_URL, build_index, make_faq_search_tool
+from semantic_router import SentenceTransformerEmbedder
+
+faq_index = build_index(
+    FAQ_PDF_URL,
+    path="faq_index.bin",
+    embedder=SentenceTransformerEmbedder("sentence-transformers/all-MiniLM-L6-v2"),
 )
+pdf_search_tool = make_faq_search_tool(faq_index)
+faq_index.search("What are the opening hours?", k=1)
+
+# %% [markdown]
+# The benchmark compares the two kinds of start-up on a synthetic FAQ. It also checks that the float32 and int8 indexes return the same top chunk as the freshly embedded vectors.
+# 
+
+# %%
+from faq_index import benchmark as benchmark_faq_index
+
+benchmark_faq_index()
+
+# %% [markdown]
+# Every customer question is embedded by the MiniLM model before the index is searched, one question at a time. `make_fast_embedder` from `batch_embedder.py` stacks three improvements. An int8-quantized copy of the model runs through ONNX Runtime, or PyTorch when ONNX Runtime is missing. A micro-batcher embeds questions that arrive together in one forward pass. An LRU cache answers repeated questions without running the model. The index is rebuilt once with the quantized model, since its vectors differ slightly from the original's.
+# 
+
+# %%
+from batch_embedder import make_fast_embedder
+
+fast_embedder = make_fast_embedder()
+faq_index = build_index(FAQ_PDF_URL, path="faq_index_int8.bin", embedder=fast_embedder)
+pdf_search_tool = make_faq_search_tool(faq_index)
+faq_index.search("What are the timings?", k=1)
+fast_embedder.stats()
+
+# %% [markdown]
+# The benchmark sends concurrent questions, half of them repeats of popular ones, through the original embedding path and through the faster ones, and reports queries per second and latency percentiles.
+# 
+
+# %%
+from batch_embedder import benchmark as benchmark_embedder
+
+benchmark_embedder()
 
 # %% [markdown]
 # ### Approach 1: The Standard Method (Agent-Centric Tools)
@@ -320,7 +359,7 @@ while True:
 # Now, we'll refactor our solution to use a task-centric approach. We will create a multi-step process where each step (Task) has its own dedicated tool. This makes the agent's job simpler and the overall workflow more reliable.
 # 
 # Our new workflow will have two tasks:
-# 1.  **Search the FAQ:** This task will *only* use the `PDFSearchTool`.
+# 1.  **Search the FAQ:** This task will *only* use the FAQ search tool, `pdf_search_tool`.
 # 2.  **Draft the Response:** This task will use the information from the first two tasks to write the final answer. It needs no tools.
 # 
 # #### **Step 2.1: Create the Agent**
@@ -421,6 +460,65 @@ while True:
     except Exception as e:
         print(f"An error occurred: {e}")
 
+# %% [markdown]
+# ### Answering frequent questions without the crew
+# 
+# Many customers ask the same few questions, and each one runs the whole crew again. `AnswerCache` from `faq_answers.py` is checked before the crew runs. It answers a question when its normalized text matches a question answered before, or when it is similar enough in meaning to one that mentions the same numbers. Only answers that you have approved are served. The crew's answers wait in `pending()` until you call `approve`. Each answer is tied to the version of the FAQ PDF, taken from the hash recorded in the index, and to the embedding model that produced its vector, so a new PDF or a new embedder invalidates all of them. `report()` shows how many questions each path answered and how long they took.
+# 
+
+# %%
+from faq_answers import AnswerCache, faq_version
+
+answers = AnswerCache(fast_embedder, version=faq_version("faq_index_int8.bin"))
+
+print("\nWelcome to The Daily Dish Chatbot!")
+print("What would you like to know? (Type 'exit' to quit)")
+
+while True: 
+    user_input = input("\nYour question: ")
+    if user_input.lower() == 'exit':
+        print("Thank you for chatting. Have a great day!")
+        break
+    
+    if not user_input:
+        print("Please type a question.")
+        continue
+
+    try:
+        answer = answers.ask(task_centric_crew, user_input)
+        print("\n--- The Daily Dish Assistant ---")
+        print(answer)
+        print("--------------------------------")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+answers.report()
+
+# %% [markdown]
+# Review the answers the crew produced before the cache serves them. For each pending answer, type `y` to approve it, `n` to reject it, or press Enter to leave it pending for later. Rejected answers are deleted, so the crew answers that question again next time.
+# 
+
+# %%
+for question, answer in answers.pending():
+    print(f"Q: {question}\nA: {answer}")
+    decision = input("Approve this answer? [y/n/Enter to skip] ").strip().lower()
+    if decision == "y":
+        answers.approve(question)
+    elif decision == "n":
+        answers.reject(question)
+    print()
+
+answers.stats()
+
+# %% [markdown]
+# The benchmark replays 300 questions, most of them rewordings of five popular ones, against a stub crew. It also counts answers served for the wrong question and shows the invalidation when the FAQ version changes.
+# 
+
+# %%
+from faq_answers import benchmark as benchmark_answers
+
+benchmark_answers()
+
 # %% [markdown]
 # <!-- ## Conclusion
 # 
@@ -179,6 +179,26 @@ print(f"Search Results for '{search_results}':\n")
 # %%
 print("keys of search_results", search_results.keys())
 
+# %% [markdown]
+# ### Caching search results
+# 
+# Every `SerperDevTool()` sends each query over the network, even one it answered a minute ago, and each request costs time and API quota. `make_cached_search_tool` from `search_cache.py` builds a `SerperDevTool` whose searches go through a `PersistentSearchCache`. The cache normalizes queries (case and spacing do not matter) and keeps results in `search_cache.sqlite`, so later runs of the notebook reuse them too. How long a result stays fresh depends on the query: one hour for news, six hours for prices and a week for everything else. A result past that age is still returned right away while a fresh copy is fetched in the background; a much older one is fetched again first. `stats()` shows the hit rate, and `class_stats()` breaks it down by query class.
+# 
+# Searches that miss the cache go through the process-wide `SearchClient` described further below. `configure_client` creates it with the request rate of your Serper plan before the first tool is built.
+# 
+
+# %%
+from search_cache import PersistentSearchCache, make_cached_search_tool
+from search_client import configure_client
+
+configure_client(rate=50.0)  # requests per second allowed by your Serper plan
+search_cache = PersistentSearchCache("search_cache.sqlite")
+cached_search_tool = make_cached_search_tool(search_cache)
+
+cached_search_tool.run(query=search_query)
+cached_search_tool.run(query="latest breakthroughs in  Machine Learning")  # same query once normalized
+search_cache.stats()
+
 # %% [markdown]
 # ## Setting up our LLM
 # 
@@ -249,7 +269,7 @@ research_agent = Agent(
   verbose=True,
   allow_delegation=False,
   llm = llm,
-  tools=[SerperDevTool()]
+  tools=[cached_search_tool]
 )
 
 # %% [markdown]
@@ -476,7 +496,7 @@ social_media_agent = Agent(
   verbose=True,
   allow_delegation=False,
   llm = llm,
-  tools=[SerperDevTool()]
+  tools=[cached_search_tool]
 )
 
 # %% [markdown]
@@ -565,6 +585,137 @@ result = crew.kickoff(inputs={"topic": "Latest Generative AI Breakthroughs"})
 # </details>
 # 
 
+# %% [markdown]
+# ### Running independent tasks in parallel
+# 
+# With `Process.sequential` the social media task waits for the blog post, even though both the writer and the social media strategist only need the research report. `kickoff_dag` from `crew_dag.py` reads each task's `context` to find the tasks it depends on, and starts every task as soon as those have finished, so tasks that do not depend on each other run at the same time. A task without `context` keeps depending on the task before it, as in a sequential crew.
+# 
+# Below, both tasks list `research_task` as their context, so they run concurrently once the research is done. `report()` shows when each task ran and compares the total time of the kickoff with its critical path, the longest chain of dependent tasks, and with the time the same tasks would take one after another.
+# 
+
+# %%
+from crew_dag import kickoff_dag
+
+writer_task.context = [research_task]
+social_media_strategy_task.context = [research_task]
+
+result = kickoff_dag(
+    [research_task, writer_task, social_media_strategy_task],
+    inputs={"topic": "Latest Generative AI Breakthroughs"},
+)
+result.report()
+print(result.tasks_output[2].raw)
+
+# %% [markdown]
+# ### Streaming task outputs as they finish
+# 
+# `crew.kickoff` returns only when the last task is done, although the research report is ready long before the blog post and the social media posts. `astream_kickoff` from `crew_stream.py` runs the same kickoff in the background and yields an event for each task the moment it finishes, so you can start publishing the research while the other agents are still working. Each event records the seconds since the start in `elapsed`, and the last event carries the usual crew output. Pass `dag=True` to run the tasks with `kickoff_dag`, and `tokens=True` to also receive the model's output as it is generated when the agents' `LLM` was created with `stream=True`. A crew cannot be stopped once it has started: if you leave the loop early, closing the generator waits for the remaining tasks to finish.
+# 
+
+# %%
+from bench import run_async
+from crew_stream import astream_kickoff
+
+async def print_task_outputs():
+    async for event in astream_kickoff(crew, inputs={"topic": "Latest Generative AI Breakthroughs"}):
+        if event["type"] == "task":
+            print(f"[{event['elapsed']:.1f}s] {event['output'].agent} finished:")
+            print(event["output"].raw[:300], "\n")
+        elif event["type"] == "done":
+            print(f"[{event['elapsed']:.1f}s] crew finished")
+
+run_async(print_task_outputs())
+
+# %% [markdown]
+# The benchmark measures when the first task output becomes available with stub tasks of the same shape: a blocking kickoff, streaming, and streaming with `dag=True`.
+# 
+
+# %%
+from crew_stream import benchmark as benchmark_stream
+
+benchmark_stream()
+
+# %% [markdown]
+# ### Compacting the context passed between tasks
+# 
+# The writer and the social media strategist both receive the full research report as their context. `kickoff_dag` accepts a `compactor` that builds a shorter context instead. `ContextCompactor` from `context_compaction.py` passes pydantic results as compact JSON and shortens any other output longer than `max_tokens` to its most informative sentences, keeping headings. `report()` lists the context tokens each task would have received and the number it actually got.
+# 
+
+# %%
+from context_compaction import ContextCompactor
+
+compactor = ContextCompactor(max_tokens=400)
+result = kickoff_dag(
+    [research_task, writer_task, social_media_strategy_task],
+    inputs={"topic": "Latest Generative AI Breakthroughs"},
+    compactor=compactor,
+)
+compactor.report()
+
+# %% [markdown]
+# The benchmark runs the five tasks of a meal planning crew with stub outputs. Its summary task depends on four other tasks.
+# 
+
+# %%
+from context_compaction import benchmark as benchmark_compaction
+
+benchmark_compaction()
+
+# %% [markdown]
+# ### Running the crew for many topics
+# 
+# Running `crew.kickoff` for one topic after another leaves the crew idle while it waits for the model and for searches, and topics about related subjects repeat many of the same queries. `kickoff_batch` from `crew_batch.py` runs one copy of the crew per topic, with at most `max_concurrency` topics in flight. The research and social media agents already use `cached_search_tool`, so every agent and every topic answers from the same `search_cache`. A query is fetched once, and identical queries made at the same time wait for the first one. The batch report shows topics per hour, tokens and estimated cost per topic, and any failed topics, which are recorded instead of stopping the batch.
+# 
+
+# %%
+from crew_batch import kickoff_batch
+
+crew = Crew(
+    agents=[research_agent, writer_agent, social_media_agent],
+    tasks=[research_task, writer_task, social_media_strategy_task],
+    process=Process.sequential,
+    verbose=False
+)
+
+topics = [
+    "Latest Generative AI Breakthroughs",
+    "Generative AI in healthcare",
+    "Open-source large language models",
+    "AI chips and accelerators",
+]
+batch = kickoff_batch(crew, topics, max_concurrency=4)
+batch.report(per_topic=True)
+search_cache.stats()
+
+# %% [markdown]
+# The benchmark runs the same comparison against a local stub of the Serper API: 40 topics one at a time without a cache, and then 8 at a time with a shared cache.
+# 
+
+# %%
+from crew_batch import benchmark as benchmark_batch
+
+benchmark_batch(topics=40, max_concurrency=8)
+
+# %% [markdown]
+# The search cache has its own benchmark. It runs 30 searches three times against the stub server: with an empty cache file, again from a newly opened cache as a new process would, and once more two hours later, when the news results are stale and are refreshed in the background.
+# 
+
+# %%
+from search_cache import benchmark as benchmark_search_cache
+
+benchmark_search_cache()
+search_cache.class_stats()
+
+# %% [markdown]
+# Searches that miss the cache go through one `SearchClient` from `search_client.py` that every cached search tool in the process shares. It keeps connections open between requests instead of opening a new one (and paying for a new TLS handshake) for every search. It limits each API key to a number of requests per second, so agents running in parallel do not run into Serper's rate limit. Requests rejected with `429` or a server error are retried after a randomized, growing delay. Its settings come from the `configure_client(rate=...)` call in the caching section; `get_client()` returns that client and raises `ValueError` if it is asked for different settings, and calling `configure_client` again replaces the client for every tool. The benchmark measures requests per second and requests per connection against the local stub server.
+# 
+
+# %%
+from search_client import benchmark as benchmark_search_client, get_client
+
+benchmark_search_client()
+get_client().stats()
+
 # %% [markdown]
 # ## Authors
 # 
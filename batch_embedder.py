@@ -0,0 +1,339 @@
+# batch_embedder.py
+import importlib.util
+import platform
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from bench import percentile, print_table
+from embedder_identity import embedder_identity
+
+
+def embed_many(embedder, texts):
+    """Embeds `texts` in one call when the embedder supports batches, otherwise one by one."""
+    embed_batch = getattr(embedder, "embed_batch", None)
+    if embed_batch is not None:
+        return np.asarray(embed_batch(texts), dtype=np.float32)
+    return np.stack([embedder.embed(text) for text in texts]).astype(np.float32)
+
+
+def _onnx_file():
+    """Picks the prebuilt int8 ONNX export of the model that matches this CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        flags = ""
+    if "avx512_vnni" in flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512f" in flags:
+        return "onnx/model_qint8_avx512.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+class QuantizedEmbedder:
+    """
+    CPU-optimized, int8-quantized version of the MiniLM sentence embedder.
+
+    With `backend="onnx"` it runs the model's int8 ONNX export for this
+    CPU through sentence-transformers, Optimum and ONNX Runtime. When
+    Optimum or ONNX Runtime is not installed, or the export cannot be
+    loaded, it falls back to PyTorch with dynamic int8 quantization of the
+    linear layers. Vectors are normalized, as with `SentenceTransformerEmbedder`.
+
+    `model_name` names the backend that actually loaded and, for ONNX, the
+    export file, so stored vectors are rejected when either changes. Reading
+    it loads the model.
+    """
+
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", backend="onnx"):
+        self.base_model = model_name
+        self.backend = backend
+        self.onnx_file = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self):
+        self._ensure_loaded()
+        variant = f"onnx, {self.onnx_file}" if self.backend == "onnx" else self.backend
+        return f"{self.base_model} (int8, {variant})"
+
+    def _ensure_loaded(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        # sentence-transformers reports a missing ONNX backend with a bare Exception, so check for it first.
+        if self.backend == "onnx" and not all(importlib.util.find_spec(name) for name in ("onnxruntime", "optimum")):
+            self.backend = "torch"
+        if self.backend == "onnx":
+            file_name = _onnx_file()
+            try:
+                model = SentenceTransformer(self.base_model, device="cpu", backend="onnx",
+                                            model_kwargs={"file_name": file_name})
+                self.onnx_file = file_name
+                return model
+            except (ImportError, OSError, TypeError, ValueError):
+                self.backend = "torch"
+        import torch
+
+        model = SentenceTransformer(self.base_model, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def embed_batch(self, texts):
+        model = self._ensure_loaded()
+        return model.encode(list(texts), batch_size=max(len(texts), 1), normalize_embeddings=True).astype(np.float32)
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+
+class MicroBatcher:
+    """
+    Groups embedding requests from concurrent callers into batches.
+
+    A single worker thread runs the model. Requests that arrive while it is
+    busy wait in a queue and go into the next batch together, up to
+    `max_batch` texts, so busy periods cost one forward pass per batch
+    instead of one per query. `max_wait` seconds can be added to collect
+    more requests even when the model is idle.
+    """
+
+    def __init__(self, embedder, max_batch=32, max_wait=0.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.texts = 0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self):
+        return embedder_identity(self.embedder)
+
+    def embed(self, text):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._work, daemon=True)
+                    self._worker.start()
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def embed_batch(self, texts):
+        return embed_many(self.embedder, texts)
+
+    def _work(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)) if self.max_wait
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                vectors = embed_many(self.embedder, [text for text, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def stats(self):
+        return {"batches": self.batches, "mean batch": self.texts / self.batches if self.batches else 0.0}
+
+
+class CachedEmbedder:
+    """
+    LRU cache of query embeddings in front of another embedder.
+
+    Queries are keyed on their lower-cased, whitespace-normalized text,
+    which the uncased MiniLM model embeds identically. Cached vectors are
+    read-only. When several threads ask for the same missing query at once,
+    only the first one embeds it and the others wait for its vector.
+    """
+
+    def __init__(self, embedder, max_entries=4096):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self):
+        return embedder_identity(self.embedder)
+
+    @staticmethod
+    def key(text):
+        return " ".join(text.lower().split())
+
+    def _claim(self, key):
+        """Returns (vector, future, owner): the cached vector, or the future of the embedding in flight."""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector, None, False
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+                return None, future, True
+            self.coalesced += 1
+            return None, future, False
+
+    def _put(self, key, vector):
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            future = self._in_flight.pop(key)
+        future.set_result(vector)
+        return vector
+
+    def _fail(self, keys, error):
+        with self._lock:
+            futures = [self._in_flight.pop(key) for key in keys]
+        for future in futures:
+            future.set_exception(error)
+
+    def _lookup(self, texts, embed):
+        keys = [self.key(text) for text in texts]
+        claims = [self._claim(key) for key in keys]
+        owned = [i for i, (_, _, owner) in enumerate(claims) if owner]
+        if owned:
+            try:
+                embedded = embed([texts[i] for i in owned])
+            except Exception as error:
+                self._fail([keys[i] for i in owned], error)
+                raise
+            for i, vector in zip(owned, embedded):
+                self._put(keys[i], vector)
+        # Owned futures are resolved above, so a query repeated within the batch does not wait on itself.
+        return [vector if vector is not None else future.result() for vector, future, _ in claims]
+
+    def embed(self, text):
+        return self._lookup([text], lambda missing: [self.embedder.embed(missing[0])])[0]
+
+    def embed_batch(self, texts):
+        return np.stack(self._lookup(texts, lambda missing: embed_many(self.embedder, missing)))
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0, "entries": len(self._entries)}
+
+
+def make_fast_embedder(model_name="sentence-transformers/all-MiniLM-L6-v2", max_batch=32, max_entries=4096):
+    """Returns the int8 model behind a micro-batcher behind an LRU cache, ready to pass as `embedder`."""
+    return CachedEmbedder(MicroBatcher(QuantizedEmbedder(model_name), max_batch=max_batch), max_entries=max_entries)
+
+
+class _StubModel:
+    """
+    Stands in for MiniLM on a CPU when sentence-transformers is not installed.
+
+    Each forward pass uses the whole CPU, so passes run one at a time and
+    cost `overhead` seconds plus `per_text` for every text in the batch.
+    """
+
+    def __init__(self, overhead=0.004, per_text=0.0004):
+        from semantic_router import HashingEmbedder
+
+        self.model_name = "stub MiniLM"
+        self.overhead = overhead
+        self.per_text = per_text
+        self._hashing = HashingEmbedder()
+        self._lock = threading.Lock()
+
+    def embed_batch(self, texts):
+        with self._lock:
+            time.sleep(self.overhead + self.per_text * len(texts))
+        return np.stack([self._hashing.embed(text) for text in texts])
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+
+def benchmark(queries=2000, threads=8, popular=20, distinct=500, seed=0):
+    """
+    Measures queries/s and p95 latency of concurrent FAQ queries for each embedding path.
+
+    Half of the queries repeat one of `popular` questions, as a chatbot's
+    traffic does. Uses the real MiniLM models when sentence-transformers is
+    installed and `_StubModel` otherwise, in which case the int8 row is
+    skipped since the stub cannot show the effect of quantization.
+    """
+    import random
+
+    try:
+        import sentence_transformers  # noqa: F401
+        from semantic_router import SentenceTransformerEmbedder
+
+        current, quantized = SentenceTransformerEmbedder(), QuantizedEmbedder()
+        current.embed("warm up")
+        quantized.embed("warm up")
+    except ImportError:
+        current, quantized = _StubModel(), None
+
+    rng = random.Random(seed)
+    texts = [f"What are the timings on day {rng.randrange(popular)}?" if rng.random() < 0.5
+             else f"Can I bring a group of {rng.randrange(distinct)} people for dinner?" for _ in range(queries)]
+
+    def measure(mode, embedder):
+        latencies = []
+
+        def run(text):
+            start = time.perf_counter()
+            embedder.embed(text)
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(run, texts))
+        elapsed = time.perf_counter() - start
+        return {"path": mode, "queries/s": len(texts) / elapsed, "p50 ms": 1000 * percentile(latencies, 50),
+                "p95 ms": 1000 * percentile(latencies, 95), **getattr(embedder, "stats", dict)()}
+
+    rows = [measure("one query per forward pass (current)", current)]
+    if quantized is not None:
+        rows.append(measure("int8", quantized))
+    base = quantized or current
+    rows.append(measure("micro-batched", MicroBatcher(base)))
+    rows.append(measure("micro-batched + LRU cache", CachedEmbedder(MicroBatcher(base))))
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    rows = [{key: row.get(key, "-") for key in keys} for row in rows]
+    print_table(f"FAQ query embedding ({queries} queries, {threads} threads, {current.model_name})", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,43 @@
+# bench.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_async(coro):
+    """
+    Runs a coroutine to completion from synchronous code.
+
+    Inside Jupyter an event loop is already running, so the coroutine is
+    executed on a fresh loop in a worker thread instead of `asyncio.run`.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def percentile(values, p):
+    """Returns the p-th percentile (0-100) of `values` using linear interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def print_table(title, rows):
+    """Prints a list of dicts as a fixed-width table."""
+    print(title)
+    print("=" * len(title))
+    if not rows:
+        return
+    headers = list(rows[0])
+    cells = [[f"{row[h]:.3f}" if isinstance(row[h], float) else str(row[h]) for h in headers] for row in rows]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)).rstrip())
+    for c in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(c, widths)).rstrip())
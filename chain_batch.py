@@ -0,0 +1,110 @@
+# chain_batch.py
+import asyncio
+import time
+
+from bench import percentile, print_table, run_async
+from prompts import cover_letter_prompt, resume_summary_prompt
+from stub_llm import StubChatModel
+
+
+async def _complete(llm, prompts):
+    """Sends a chunk of prompts through the model's batch API, or concurrent `ainvoke` calls without one."""
+    if hasattr(llm, "abatch"):
+        return await llm.abatch(prompts)
+    return await asyncio.gather(*(llm.ainvoke(prompt) for prompt in prompts))
+
+
+async def arun_chain_batch(llm, inputs, batch_size=8, max_pending=2):
+    """
+    Runs the resume summary -> cover letter chain over many `ChainState` inputs.
+
+    Inputs are processed in chunks of `batch_size`. The two stages run as
+    separate tasks connected by a bounded queue, so stage 2 of one chunk
+    overlaps stage 1 of the next; `max_pending` caps how many finished stage 1
+    chunks may wait for stage 2. Returns the final states in input order and
+    a stats dict for `print_batch_report`.
+    """
+    queue = asyncio.Queue(maxsize=max_pending)
+    results = []
+    stats = {
+        "items": 0,
+        "stage_latencies": {"resume_summary": [], "cover_letter": []},
+        "stage_busy": {"resume_summary": 0.0, "cover_letter": 0.0},
+    }
+
+    async def stage(name, prompt_fn, field, chunk):
+        start = time.perf_counter()
+        responses = await _complete(llm, [prompt_fn(state) for state in chunk])
+        elapsed = time.perf_counter() - start
+        stats["stage_busy"][name] += elapsed
+        stats["stage_latencies"][name].extend([elapsed] * len(chunk))
+        return [{**state, field: response.content} for state, response in zip(chunk, responses)]
+
+    async def summaries():
+        chunk = []
+        for state in inputs:
+            chunk.append(dict(state))
+            if len(chunk) == batch_size:
+                await queue.put(await stage("resume_summary", resume_summary_prompt, "resume_summary", chunk))
+                chunk = []
+        if chunk:
+            await queue.put(await stage("resume_summary", resume_summary_prompt, "resume_summary", chunk))
+        await queue.put(None)
+
+    async def cover_letters():
+        while (chunk := await queue.get()) is not None:
+            results.extend(await stage("cover_letter", cover_letter_prompt, "cover_letter", chunk))
+
+    start = time.perf_counter()
+    await asyncio.gather(summaries(), cover_letters())
+    stats["items"] = len(results)
+    stats["wall_time"] = time.perf_counter() - start
+    return results, stats
+
+
+def run_chain_batch(llm, inputs, batch_size=8, max_pending=2):
+    """Synchronous entry point for `arun_chain_batch`."""
+    return run_async(arun_chain_batch(llm, inputs, batch_size, max_pending))
+
+
+def print_batch_report(stats):
+    """Prints per-stage throughput and p50/p95 latency for a batch run."""
+    rows = []
+    for name, latencies in stats["stage_latencies"].items():
+        busy = stats["stage_busy"][name]
+        rows.append({
+            "stage": name,
+            "items": len(latencies),
+            "items/s": len(latencies) / busy if busy else 0.0,
+            "p50 s": percentile(latencies, 50),
+            "p95 s": percentile(latencies, 95),
+        })
+    rows.append({
+        "stage": "end-to-end",
+        "items": stats["items"],
+        "items/s": stats["items"] / stats["wall_time"] if stats["wall_time"] else 0.0,
+        "p50 s": "-",
+        "p95 s": "-",
+    })
+    print_table(f"Prompt chain batch ({stats['items']} job descriptions, {stats['wall_time']:.2f}s)", rows)
+
+
+def benchmark(count=20, batch_size=8, latency=0.2, jitter=0.1):
+    """Compares one-at-a-time chain runs with the pipelined batch runner against a stub model."""
+    inputs = [{"job_description": f"Job {i}: data scientist with Python, NLP and MLOps experience."} for i in range(count)]
+
+    llm = StubChatModel(latency=latency, jitter=jitter)
+    start = time.perf_counter()
+    for state in inputs:
+        state = {**state, "resume_summary": llm.invoke(resume_summary_prompt(state)).content}
+        llm.invoke(cover_letter_prompt(state))
+    sequential = time.perf_counter() - start
+
+    _, stats = run_chain_batch(StubChatModel(latency=latency, jitter=jitter), inputs, batch_size)
+    print(f"One at a time: {sequential:.2f}s ({count / sequential:.1f} items/s)")
+    print_batch_report(stats)
+    return sequential, stats
+
+
+if __name__ == "__main__":
+    benchmark()
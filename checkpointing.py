@@ -0,0 +1,176 @@
+# checkpointing.py
+import os
+import sqlite3
+import time
+import uuid
+from typing import TypedDict
+
+from bench import print_table
+
+
+class SimulatedCrash(RuntimeError):
+    """Raised by `crash_once` to imitate the process dying inside a node."""
+
+
+def open_checkpointer(path="checkpoints.sqlite"):
+    """Returns a LangGraph `SqliteSaver` backed by a local SQLite file."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+
+def new_request_id():
+    """Returns a fresh request id to use as the thread id of one run."""
+    return uuid.uuid4().hex
+
+
+def thread_config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def invoke_resumable(app, inputs, request_id=None):
+    """
+    Invokes a checkpointed app, resuming the request's thread if an earlier run stopped part-way.
+
+    `request_id` identifies one request, for example a job id from a queue,
+    and is used as the thread id; without one a fresh id is generated, so
+    there is nothing to resume. If the thread has pending nodes the graph
+    continues from its last checkpoint without re-running the finished ones.
+    A thread that already completed is run again from `inputs`: checkpoints
+    recover interrupted runs, they do not cache results.
+    """
+    config = thread_config(request_id or new_request_id())
+    if app.get_state(config).next:
+        return app.invoke(None, config)
+    return app.invoke(inputs, config)
+
+
+def crash_once(node):
+    """Wraps a node so its first call raises `SimulatedCrash` and later calls run normally."""
+    crashed = []
+
+    def wrapper(state):
+        if not crashed:
+            crashed.append(True)
+            raise SimulatedCrash(f"simulated crash in {node.__name__}")
+        return node(state)
+
+    wrapper.__name__ = node.__name__
+    return wrapper
+
+
+def _build_router_graph(router_node, handler_node, checkpointer):
+    from langgraph.graph import StateGraph
+
+    class RouterState(TypedDict):
+        user_input: str
+        task_type: str
+        output: str
+
+    workflow = StateGraph(RouterState)
+    workflow.add_node("router", router_node)
+    workflow.add_node("ride_hailing_call", handler_node)
+    workflow.set_entry_point("router")
+    workflow.add_conditional_edges("router", lambda state: state["task_type"], {"ride_hailing_call": "ride_hailing_call"})
+    workflow.set_finish_point("ride_hailing_call")
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def crash_injection_check(path=":memory:"):
+    """
+    Crashes the handler after `router_node` has finished, then re-invokes the same request id.
+
+    Checks that the crash leaves the routed state in the checkpoint with the
+    handler pending, and that the resumed run reuses it: the router runs
+    once and the handler twice, the first time crashing. Raises
+    AssertionError otherwise and returns the node call counts.
+    """
+    from stub_llm import StubChatModel
+
+    llm_router = StubChatModel(
+        latency=0.01,
+        tool_calls=lambda prompt: [{"name": "Router", "args": {"role": "ride_hailing_call"}, "id": "stub"}],
+    ).bind_tools(["Router"])
+    llm = StubChatModel(latency=0.01)
+    calls = {"router": 0, "handler": 0}
+
+    def router_node(state):
+        calls["router"] += 1
+        return {"task_type": llm_router.invoke(state["user_input"]).tool_calls[0]["args"]["role"]}
+
+    def ride_hailing_node(state):
+        return {"output": llm.invoke(state["user_input"]).content}
+
+    crashing_handler = crash_once(ride_hailing_node)
+
+    def handler_node(state):
+        calls["handler"] += 1
+        return crashing_handler(state)
+
+    app = _build_router_graph(router_node, handler_node, open_checkpointer(path))
+    inputs = {"user_input": "I need a ride from downtown to the airport at 3pm"}
+    request_id = new_request_id()
+    try:
+        invoke_resumable(app, inputs, request_id)
+    except SimulatedCrash:
+        pass
+    else:
+        raise AssertionError("the handler did not crash on its first call")
+    snapshot = app.get_state(thread_config(request_id))
+    assert snapshot.next == ("ride_hailing_call",), f"expected the handler to be pending, got {snapshot.next}"
+    assert snapshot.values.get("task_type") == "ride_hailing_call", f"routed state was not saved: {snapshot.values}"
+
+    result = invoke_resumable(app, inputs, request_id)
+    assert result["task_type"] == "ride_hailing_call" and result["output"], f"resumed run returned {result}"
+    assert calls == {"router": 1, "handler": 2}, f"expected one router and two handler calls, got {calls}"
+    assert llm_router.calls == 1, f"the router model was called {llm_router.calls} times"
+    print(f"resumed run output: {result['output']}")
+    print(f"router calls: {calls['router']}, handler calls: {calls['handler']} (the first one crashed)")
+    return calls
+
+
+def benchmark(hops=10, runs=50, path="checkpoint_benchmark.sqlite"):
+    """Measures the per-node overhead of in-memory and SQLite checkpoints on a chain of no-op nodes."""
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.graph import StateGraph
+
+    class State(TypedDict):
+        user_input: str
+        output: str
+
+    def build(checkpointer):
+        graph = StateGraph(State)
+        for hop in range(hops):
+            graph.add_node(f"hop_{hop}", lambda state, hop=hop: {"output": f"hop {hop}"})
+            if hop:
+                graph.add_edge(f"hop_{hop - 1}", f"hop_{hop}")
+        graph.set_entry_point("hop_0")
+        graph.set_finish_point(f"hop_{hops - 1}")
+        return graph.compile(checkpointer=checkpointer)
+
+    def remove_database():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    remove_database()
+    sqlite_saver = open_checkpointer(path)
+    rows = []
+    baseline = None
+    for name, checkpointer in (("none", None), ("memory", InMemorySaver()), ("sqlite", sqlite_saver)):
+        app = build(checkpointer)
+        start = time.perf_counter()
+        for run in range(runs):
+            app.invoke({"user_input": "ride to the airport"}, thread_config(f"run-{run}"))
+        per_node = (time.perf_counter() - start) / (runs * hops)
+        baseline = per_node if baseline is None else baseline
+        rows.append({"checkpointer": name, "ms/node": 1000 * per_node, "overhead ms/node": 1000 * (per_node - baseline)})
+    sqlite_saver.conn.close()
+    remove_database()
+    print_table(f"Checkpoint write overhead ({hops}-node chain, {runs} runs)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    crash_injection_check()
+    benchmark()
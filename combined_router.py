@@ -0,0 +1,165 @@
+# combined_router.py
+import time
+from typing import TypedDict
+
+from pydantic import BaseModel, Field
+
+from bench import percentile, print_table
+from prompts import SERVICE_INSTRUCTIONS, service_prompt
+
+
+class RouteAndAnswer(BaseModel):
+    role: str = Field(..., description="The service that handles the request, exactly one of the listed roles.")
+    confidence: float = Field(..., description="How sure you are of the role, from 0 to 1.")
+    answer: str = Field(..., description="The reply the assistant for that role gives to the request.")
+
+
+def combined_prompt(user_input, instructions=SERVICE_INSTRUCTIONS):
+    roles = "\n\n".join(f"Role `{role}`:\n{text}" for role, text in instructions.items())
+    return f"""
+Classify the user request into one of the roles below, rate your confidence, and answer it as the assistant for that role would, following the role's instructions. The instructions are the ones the role's handler is given.
+
+{roles}
+
+User Request: "{user_input}"
+"""
+
+
+class CombinedMetrics:
+    """Counts requests answered by the single call and those sent down the two-step path."""
+
+    def __init__(self):
+        self.single_call = 0
+        self.fallbacks = 0
+
+    def summary(self):
+        total = self.single_call + self.fallbacks
+        return {
+            "requests": total,
+            "single_call_rate": self.single_call / total if total else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def make_combined_router_node(llm, instructions=SERVICE_INSTRUCTIONS, threshold=0.7, metrics=None):
+    """
+    Returns a node that classifies a request and drafts its answer in one model call.
+
+    The model is forced to call the `RouteAndAnswer` tool. When it returns a
+    known role with confidence of at least `threshold`, the node fills in both
+    `task_type` and `output`; otherwise it leaves `output` empty so that
+    `combined_route` sends the request to the usual router and handler.
+    """
+    metrics = metrics if metrics is not None else CombinedMetrics()
+    llm_combined = llm.bind_tools([RouteAndAnswer], tool_choice="RouteAndAnswer")
+
+    def combined_router_node(state):
+        response = llm_combined.invoke(combined_prompt(state["user_input"], instructions))
+        if response.tool_calls:
+            args = response.tool_calls[0]["args"]
+            try:
+                confidence = float(args.get("confidence", 0))
+            except (TypeError, ValueError):
+                # Malformed output such as "high" or null is treated as no confidence.
+                confidence = 0.0
+            if args.get("role") in instructions and confidence >= threshold:
+                metrics.single_call += 1
+                return {"task_type": args["role"], "output": args.get("answer", "")}
+        metrics.fallbacks += 1
+        return {"task_type": "", "output": ""}
+
+    combined_router_node.metrics = metrics
+    return combined_router_node
+
+
+def combined_route(state):
+    """Ends the run when the combined call answered, and falls back to the two-step router otherwise."""
+    return "answered" if state.get("output") else "router"
+
+
+def add_combined_entry(workflow, combined_node, router_node_name="router"):
+    """
+    Puts `combined_node` in front of an existing router workflow.
+
+    Call it instead of `set_entry_point(router_node_name)`; the rest of the
+    graph (the router, its conditional edges and the handlers) is unchanged.
+    """
+    workflow.add_node("classify_and_answer", combined_node)
+    workflow.set_entry_point("classify_and_answer")
+    workflow.add_conditional_edges("classify_and_answer", combined_route, {
+        "answered": "__end__",
+        "router": router_node_name,
+    })
+    return workflow
+
+
+def benchmark(requests=100, latency=0.03, jitter=0.03, low_confidence_every=5, threshold=0.7):
+    """
+    Compares end-to-end latency of the two-step router and the single-call mode on stub models.
+
+    Every `low_confidence_every`-th request gets a low-confidence route from
+    the combined call and takes the fallback path.
+    """
+    from langgraph.graph import StateGraph
+
+    from stub_llm import StubChatModel
+
+    class RouterState(TypedDict):
+        user_input: str
+        task_type: str
+        output: str
+
+    def combined_calls(prompt):
+        low = "#low" in prompt
+        return [{"name": "RouteAndAnswer", "id": "stub", "args": {
+            "role": "groceries", "confidence": 0.4 if low else 0.95, "answer": "Order for the driver: milk, eggs."}}]
+
+    router_calls = lambda prompt: [{"name": "Router", "args": {"role": "groceries"}, "id": "stub"}]
+    llm = StubChatModel(latency=latency, jitter=jitter, seed=1)
+    llm_router = StubChatModel(latency=latency, jitter=jitter, tool_calls=router_calls, seed=2).bind_tools(["Router"])
+    llm_for_combined = StubChatModel(latency=latency, jitter=jitter, tool_calls=combined_calls, seed=3)
+
+    def router_node(state):
+        response = llm_router.invoke(state["user_input"])
+        return {"task_type": response.tool_calls[0]["args"]["role"]}
+
+    def groceries_node(state):
+        return {"output": llm.invoke(service_prompt("groceries", state["user_input"])).content}
+
+    def build(combined_node=None):
+        workflow = StateGraph(RouterState)
+        workflow.add_node("router", router_node)
+        workflow.add_node("groceries", groceries_node)
+        if combined_node is None:
+            workflow.set_entry_point("router")
+        else:
+            add_combined_entry(workflow, combined_node)
+        workflow.add_conditional_edges("router", lambda state: state["task_type"], {"groceries": "groceries"})
+        workflow.set_finish_point("groceries")
+        return workflow.compile()
+
+    inputs = [
+        {"user_input": f"I need milk and eggs for order {i}" + (" #low" if low_confidence_every and i % low_confidence_every == 0 else "")}
+        for i in range(requests)
+    ]
+    combined_node = make_combined_router_node(llm_for_combined, threshold=threshold)
+    rows = []
+    for mode, app in (("two-step", build()), ("single call", build(combined_node))):
+        latencies = []
+        for state in inputs:
+            start = time.perf_counter()
+            app.invoke(state)
+            latencies.append(time.perf_counter() - start)
+        rows.append({
+            "mode": mode,
+            "p50 ms": 1000 * percentile(latencies, 50),
+            "p95 ms": 1000 * percentile(latencies, 95),
+            "mean ms": 1000 * sum(latencies) / len(latencies),
+            "fallbacks": combined_node.metrics.fallbacks if mode == "single call" else "-",
+        })
+    print_table(f"Router end-to-end latency ({requests} requests, stub latency {latency}s + up to {jitter}s)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,2 @@
+# conftest.py
+# Puts the repository root on sys.path so the tests under tests/ can import the helper modules.
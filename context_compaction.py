@@ -0,0 +1,213 @@
+# context_compaction.py
+import json
+import re
+import threading
+from collections import Counter
+
+from bench import print_table
+from crew_dag import CONTEXT_SEPARATOR
+from prompt_prefix import count_tokens
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the their this to was were will with "
+    "you your we our they can also which more than into about these those such".split()
+)
+
+
+def split_sentences(text):
+    """Splits text into lines, and lines into sentences, keeping markdown headings and list items whole."""
+    sentences = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(("#", "-", "*")) or re.match(r"\d+\.\s", line):
+            sentences.append(line)
+        else:
+            sentences.extend(s for s in re.split(r"(?<=[.!?])\s+", line) if s)
+    return sentences
+
+
+def _words(text):
+    return [w for w in re.findall(r"[a-z0-9$%]+", text.lower()) if w not in STOPWORDS]
+
+
+def extractive_summary(text, max_tokens):
+    """
+    Keeps the sentences of `text` that best cover its frequent terms, in their original order, within `max_tokens`.
+
+    Headings are always kept when they fit, since they give the remaining
+    sentences their structure.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    sentences = split_sentences(text)
+    frequency = Counter(w for s in sentences for w in _words(s))
+
+    def score(i):
+        words = _words(sentences[i])
+        if sentences[i].startswith("#"):
+            return float("inf")
+        return sum(frequency[w] for w in set(words)) / (len(words) or 1) ** 0.5
+
+    chosen, kept, used = set(), set(), 0
+    for i in sorted(range(len(sentences)), key=score, reverse=True):
+        tokens = count_tokens(sentences[i]) + 1
+        if sentences[i] not in kept and used + tokens <= max_tokens:
+            chosen.add(i)
+            kept.add(sentences[i])
+            used += tokens
+    return "\n".join(sentences[i] for i in sorted(chosen))
+
+
+def structured_context(output, fields=None):
+    """Renders a task's pydantic or JSON output as compact JSON, keeping only `fields` when given."""
+    model = getattr(output, "pydantic", None)
+    if model is not None:
+        data = model.model_dump(include=set(fields) if fields else None, exclude_none=True)
+    else:
+        data = getattr(output, "json_dict", None)
+        if not data:
+            return None
+        if fields:
+            data = {k: v for k, v in data.items() if k in fields}
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class ContextCompactor:
+    """
+    Shortens what each task receives from the tasks in its `context`.
+
+    Pass it to `kickoff_dag(..., compactor=...)`. An upstream output with a
+    pydantic (or JSON) result is passed as compact JSON, limited to the field
+    names listed for its model in `fields`, e.g. `{"MealPlan": ["meal_name",
+    "researched_ingredients"]}`. Any other output longer than `max_tokens`
+    is replaced by an extractive summary of that length. `report()` lists
+    the context tokens each task would have received and what it got.
+    """
+
+    def __init__(self, max_tokens=400, structured=True, fields=None):
+        self.max_tokens = max_tokens
+        self.structured = structured
+        self.fields = fields or {}
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def compact(self, output):
+        if self.structured:
+            model = getattr(output, "pydantic", None)
+            text = structured_context(output, self.fields.get(type(model).__name__) if model is not None else None)
+            if text is not None and count_tokens(text) <= self.max_tokens:
+                return text
+        return extractive_summary(output.raw, self.max_tokens)
+
+    def __call__(self, task, outputs):
+        if not outputs:
+            return ""
+        raw = CONTEXT_SEPARATOR.join(output.raw for output in outputs)
+        context = CONTEXT_SEPARATOR.join(self.compact(output) for output in outputs)
+        raw_tokens, tokens = count_tokens(raw), count_tokens(context)
+        with self._lock:
+            self.rows.append({
+                "task": getattr(getattr(task, "agent", None), "role", None) or getattr(task, "name", None) or "task",
+                "upstream": len(outputs),
+                "raw tokens": raw_tokens,
+                "compacted tokens": tokens,
+                "saved": raw_tokens - tokens,
+                "saved %": 100.0 * (raw_tokens - tokens) / raw_tokens if raw_tokens else 0.0,
+            })
+        return context
+
+    def report(self):
+        print_table("Context tokens per task", self.rows)
+        raw = sum(row["raw tokens"] for row in self.rows)
+        saved = sum(row["saved"] for row in self.rows)
+        print(f"{saved} of {raw} context tokens saved ({100.0 * saved / raw if raw else 0.0:.1f}%)")
+
+
+class _StubOutput:
+    def __init__(self, raw, pydantic=None):
+        self.raw = raw
+        self.pydantic = pydantic
+        self.json_dict = None
+
+
+class _StubAgent:
+    def __init__(self, role):
+        self.role = role
+        self.tools = []
+
+
+class _StubTask:
+    """A task that returns a fixed output and remembers the context it was given."""
+
+    def __init__(self, role, output, context=None):
+        self.agent = _StubAgent(role)
+        self.output = output
+        self.context = context
+        self.tools = []
+        self.received = None
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        self.received = context
+        return self.output
+
+
+def _prose(topic, sentences, seed):
+    import random
+
+    rng = random.Random(seed)
+    facts = ["costs about $3", "keeps for four days", "is cheaper in bulk", "suits beginners", "needs no nuts",
+             "cooks in ten minutes", "is low in sodium", "can be frozen", "serves four people", "pairs well with rice"]
+    filler = ["In our experience", "Many home cooks find that", "It is worth noting that", "As a general rule",
+              "Based on current store prices", "For a family dinner"]
+    lines = [f"## {topic}"]
+    for i in range(sentences):
+        lines.append(f"{rng.choice(filler)} the {rng.choice(['chicken', 'broccoli', 'rice', 'garlic', 'soy sauce'])} "
+                     f"{rng.choice(facts)}.")
+    return " ".join(lines[:1]) + "\n" + " ".join(lines[1:])
+
+
+def benchmark(max_tokens=300):
+    """Runs the Chef crew shape with stub outputs and compares each task's raw and compacted context."""
+    from typing import List
+
+    from pydantic import BaseModel
+
+    class MealPlan(BaseModel):
+        meal_name: str
+        difficulty_level: str
+        servings: int
+        researched_ingredients: List[str]
+
+    class GroceryShoppingPlan(BaseModel):
+        total_budget: str
+        shopping_tips: List[str]
+
+    meal = MealPlan(meal_name="Chicken Stir Fry", difficulty_level="Easy", servings=4,
+                    researched_ingredients=["chicken breast", "broccoli", "bell peppers", "garlic", "soy sauce", "rice"])
+    shopping = GroceryShoppingPlan(total_budget="$25", shopping_tips=["Buy rice in bulk", "Choose store brands"])
+
+    def build():
+        meal_task = _StubTask("Meal Planner & Recipe Researcher",
+                              _StubOutput(_prose("Recipe research", 60, 1) + "\n" + meal.model_dump_json(indent=2), meal))
+        shopping_task = _StubTask("Shopping Organizer", _StubOutput(
+            _prose("Shopping list", 50, 2) + "\n" + shopping.model_dump_json(indent=2), shopping), context=[meal_task])
+        budget_task = _StubTask("Budget Advisor", _StubOutput(_prose("Budget analysis", 80, 3)),
+                                context=[meal_task, shopping_task])
+        leftover_task = _StubTask("Leftover Manager", _StubOutput(_prose("Leftover ideas", 70, 4)))
+        summary_task = _StubTask("Report Compiler", _StubOutput("Final meal planning guide."),
+                                 context=[meal_task, shopping_task, budget_task, leftover_task])
+        return [meal_task, shopping_task, budget_task, leftover_task, summary_task]
+
+    from crew_dag import kickoff_dag
+
+    compactor = ContextCompactor(max_tokens=max_tokens)
+    tasks = build()
+    kickoff_dag(tasks, compactor=compactor)
+    compactor.report()
+    return compactor.rows
+
+
+if __name__ == "__main__":
+    benchmark()
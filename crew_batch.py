@@ -0,0 +1,166 @@
+# crew_batch.py
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import print_table
+from search_cache import search_counter
+
+# Prices used for the per-topic cost estimate; adjust them to your plan.
+DEFAULT_PRICES = {
+    "prompt_per_million": 0.71,  # watsonx llama-3-3-70b-instruct, USD per 1M input tokens
+    "completion_per_million": 0.71,
+    "per_search": 0.001,  # Serper, USD per query
+}
+
+
+class BatchResult:
+    """Per-topic rows of a `kickoff_batch` run plus an aggregate summary."""
+
+    def __init__(self, rows, outputs, wall_time):
+        self.rows = rows
+        self.outputs = outputs
+        self.wall_time = wall_time
+
+    @property
+    def failures(self):
+        return [row for row in self.rows if row["status"] != "ok"]
+
+    def summary(self):
+        done = [row for row in self.rows if row["status"] == "ok"]
+        lookups = sum(row["searches"] for row in self.rows)
+        fetches = sum(row["fetched"] for row in self.rows)
+        return {
+            "topics": len(self.rows),
+            "failed": len(self.failures),
+            "wall s": self.wall_time,
+            "topics/hour": 3600 * len(done) / self.wall_time if self.wall_time else 0.0,
+            "mean s/topic": sum(row["seconds"] for row in done) / len(done) if done else 0.0,
+            "mean tokens/topic": sum(row["tokens"] for row in done) / len(done) if done else 0.0,
+            "mean cost/topic": sum(row["cost"] for row in done) / len(done) if done else 0.0,
+            "searches": lookups,
+            "fetched": fetches,
+        }
+
+    def report(self, per_topic=False):
+        if per_topic:
+            print_table("Topics", self.rows)
+        print_table("Batch kickoff", [self.summary()])
+        for row in self.failures:
+            print(f"FAILED {row['topic']}: {row['status']}")
+
+
+def _copy_crew(crew):
+    return crew() if callable(crew) and not hasattr(crew, "kickoff") else crew.copy()
+
+
+def kickoff_batch(crew, topics, max_concurrency=4, input_key="topic", prices=DEFAULT_PRICES):
+    """
+    Runs `crew.kickoff(inputs={input_key: topic})` for many topics, `max_concurrency` at a time.
+
+    Crews keep state while they run, so each topic gets its own copy: `crew`
+    is either a `Crew`, copied with `crew.copy()`, or a function returning a
+    new crew. Give every copy's agents tools built with
+    `make_cached_search_tool` and one shared `SearchCache` so that queries
+    repeated across topics are fetched once. A failing topic is recorded
+    with its error instead of stopping the batch.
+    """
+    outputs = [None] * len(topics)
+    rows = [None] * len(topics)
+
+    def run(i, topic):
+        counter = {}
+        search_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            outputs[i] = _copy_crew(crew).kickoff(inputs={input_key: topic})
+            status = "ok"
+        except Exception as error:
+            status = f"{type(error).__name__}: {error}"
+        usage = getattr(outputs[i], "token_usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        fetched = counter.get("fetches", 0)
+        rows[i] = {
+            "topic": topic,
+            "status": status,
+            "seconds": time.perf_counter() - start,
+            "tokens": prompt_tokens + completion_tokens,
+            "searches": fetched + counter.get("hits", 0),
+            "fetched": fetched,
+            "cost": (
+                prompt_tokens * prices["prompt_per_million"] / 1e6
+                + completion_tokens * prices["completion_per_million"] / 1e6
+                + fetched * prices["per_search"]
+            ),
+        }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, run, i, topic) for i, topic in enumerate(topics)]
+        for future in futures:
+            future.result()
+    return BatchResult(rows, outputs, time.perf_counter() - start)
+
+
+class _StubUsage:
+    def __init__(self, prompt_tokens, completion_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+
+class _StubCrewOutput:
+    def __init__(self, raw, token_usage):
+        self.raw = raw
+        self.token_usage = token_usage
+
+
+class _StubCrew:
+    """Stands in for a research crew: a few searches, some overlapping across topics, plus model time."""
+
+    SHARED_QUERIES = ["generative ai trends this year", "ai regulation news"]
+
+    def __init__(self, search, llm_seconds=0.1):
+        self.search = search
+        self.llm_seconds = llm_seconds
+
+    def copy(self):
+        return _StubCrew(self.search, self.llm_seconds)
+
+    def kickoff(self, inputs):
+        topic = inputs["topic"]
+        if "fail" in topic:
+            raise RuntimeError("search tool returned no results")
+        results = [self.search(query) for query in [f"latest {topic} breakthroughs", *self.SHARED_QUERIES]]
+        time.sleep(self.llm_seconds)
+        return _StubCrewOutput(f"report on {topic} from {len(results)} searches", _StubUsage(3000, 800))
+
+
+def benchmark(topics=40, max_concurrency=8, search_latency=0.05, llm_seconds=0.1):
+    """Compares one-at-a-time kickoffs without a cache with the batch runner and a shared cache."""
+    from search_cache import SearchCache, fetch_serper, search_key
+    from stub_search import StubSearchServer
+
+    names = [f"topic {i % (topics // 2)}" for i in range(topics - 1)] + ["topic that will fail"]
+    summaries = []
+    with StubSearchServer(latency=search_latency) as server:
+        # A cache that keeps nothing fetches every query, which is how the tools behave today.
+        for mode, cache, concurrency in (
+            ("sequential, no cache", SearchCache(max_entries=0), 1),
+            (f"batch of {max_concurrency}, shared cache", SearchCache(), max_concurrency),
+        ):
+            def search(query, cache=cache):
+                return cache.get_or_fetch(search_key(query), lambda: fetch_serper(query, url=server.url))
+
+            before = server.requests
+            result = kickoff_batch(_StubCrew(search, llm_seconds), names, max_concurrency=concurrency)
+            summaries.append({"mode": mode, **result.summary(), "server requests": server.requests - before})
+    print_table(f"Batch kickoff over {topics} topics (stub search {search_latency}s, stub model {llm_seconds}s)", summaries)
+    for row in result.failures:
+        print(f"FAILED {row['topic']}: {row['status']}")
+    return summaries
+
+
+if __name__ == "__main__":
+    benchmark()
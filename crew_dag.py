@@ -0,0 +1,189 @@
+# crew_dag.py
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from bench import print_table
+
+CONTEXT_SEPARATOR = "\n\n----------\n\n"
+
+
+def task_dependencies(tasks):
+    """
+    Maps each task's index to the indexes of the tasks it depends on.
+
+    A task that sets `context` depends exactly on those tasks. A task without
+    `context` depends on the task before it, which is what `Process.sequential`
+    gives it, so only tasks that declare their context can run in parallel.
+    Like CrewAI's own validation, a context may only name earlier tasks, so
+    the task order is a topological order and the graph has no cycles; a
+    task that names itself or a later task raises ValueError.
+    """
+    index = {id(task): i for i, task in enumerate(tasks)}
+    dependencies = {}
+    for i, task in enumerate(tasks):
+        context = getattr(task, "context", None)
+        if isinstance(context, (list, tuple)):
+            unknown = [t for t in context if id(t) not in index]
+            if unknown:
+                raise ValueError(f"task {i} has context tasks that are not part of the run")
+            dependencies[i] = sorted(index[id(t)] for t in context)
+            later = [d for d in dependencies[i] if d >= i]
+            if later:
+                raise ValueError(f"task {i} has context tasks {later} that do not come before it")
+        else:
+            dependencies[i] = [i - 1] if i else []
+    return dependencies
+
+
+def critical_path(durations, dependencies):
+    """Returns (seconds, task indexes) of the longest dependency chain; dependencies must have lower indexes."""
+    finish, previous = {}, {}
+    for i in sorted(durations):
+        before = max(dependencies[i], key=lambda d: finish[d], default=None)
+        finish[i] = durations[i] + (finish[before] if before is not None else 0.0)
+        previous[i] = before
+    last = max(finish, key=finish.get)
+    path = [last]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return finish[last], path[::-1]
+
+
+def _interpolate(task, inputs):
+    if not inputs:
+        return
+    for method in ("interpolate_inputs", "interpolate_inputs_and_add_conversation_history"):
+        if hasattr(task, method):
+            getattr(task, method)(inputs)
+            break
+    agent = getattr(task, "agent", None)
+    if agent is not None and hasattr(agent, "interpolate_inputs"):
+        agent.interpolate_inputs(inputs)
+
+
+class DagOutput:
+    """Result of `kickoff_dag`: the task outputs in task order plus per-task timings."""
+
+    def __init__(self, tasks, outputs, timings, dependencies, wall_time):
+        self.tasks = tasks
+        self.tasks_output = outputs
+        self.timings = timings
+        self.dependencies = dependencies
+        self.wall_time = wall_time
+
+    @property
+    def raw(self):
+        return self.tasks_output[-1].raw if self.tasks_output else ""
+
+    def report(self):
+        """Prints when each task ran and compares the critical path with the total and sequential time."""
+        durations = {i: end - start for i, (start, end) in self.timings.items()}
+        path_time, path = critical_path(durations, self.dependencies)
+        rows = []
+        for i, task in enumerate(self.tasks):
+            start, end = self.timings[i]
+            rows.append({
+                "task": getattr(getattr(task, "agent", None), "role", None) or f"task {i}",
+                "depends on": ", ".join(str(d) for d in self.dependencies[i]) or "-",
+                "start s": start,
+                "end s": end,
+                "duration s": durations[i],
+                "critical": "*" if i in path else "",
+            })
+        print_table(
+            f"Crew DAG: {self.wall_time:.2f}s total, {path_time:.2f}s critical path, "
+            f"{sum(durations.values()):.2f}s if run sequentially",
+            rows,
+        )
+
+
+def kickoff_dag(tasks, inputs=None, max_workers=4, compactor=None):
+    """
+    Runs CrewAI tasks as a dependency graph instead of one after another.
+
+    Dependencies come from `task_dependencies`. Each task starts in a worker
+    thread as soon as all the tasks it depends on have finished, with their
+    raw outputs joined as its context, as CrewAI does for `context`. A
+    `compactor`, such as `context_compaction.ContextCompactor`, is called
+    with the task and those outputs to build a shorter context instead.
+    Inputs such as `{"topic": ...}` are interpolated into the tasks and
+    agents first.
+    """
+    dependencies = task_dependencies(tasks)
+    for task in tasks:
+        _interpolate(task, inputs)
+
+    outputs, timings, running = {}, {}, {}
+    start = time.perf_counter()
+
+    def run(i):
+        began = time.perf_counter() - start
+        task = tasks[i]
+        upstream = [outputs[d] for d in dependencies[i]]
+        if compactor is not None:
+            context = compactor(task, upstream)
+        else:
+            context = CONTEXT_SEPARATOR.join(output.raw for output in upstream)
+        agent = task.agent
+        output = task.execute_sync(agent=agent, context=context, tools=getattr(task, "tools", None) or agent.tools)
+        timings[i] = (began, time.perf_counter() - start)
+        return output
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(outputs) < len(tasks):
+            for i in range(len(tasks)):
+                if i not in outputs and i not in running and all(d in outputs for d in dependencies[i]):
+                    running[i] = executor.submit(run, i)
+            done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for i, future in list(running.items()):
+                if future in done:
+                    outputs[i] = future.result()
+                    del running[i]
+    wall_time = time.perf_counter() - start
+    return DagOutput(tasks, [outputs[i] for i in range(len(tasks))], timings, dependencies, wall_time)
+
+
+class _StubOutput:
+    def __init__(self, raw):
+        self.raw = raw
+
+
+class _StubAgent:
+    def __init__(self, role):
+        self.role = role
+        self.tools = []
+
+
+class _StubTask:
+    """Stands in for a CrewAI `Task` whose agent takes `seconds` to answer."""
+
+    def __init__(self, role, seconds, context=None):
+        self.agent = _StubAgent(role)
+        self.seconds = seconds
+        self.context = context
+        self.tools = []
+        self.callback = None
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        time.sleep(self.seconds)
+        output = _StubOutput(f"{self.agent.role} output ({len(context or '')} characters of context)")
+        if self.callback:
+            self.callback(output)
+        return output
+
+
+def benchmark(research=0.3, writing=0.3, social=0.2):
+    """Runs the research -> (writer, social media) crew shape with stub tasks, sequentially and as a DAG."""
+    research_task = _StubTask("Senior Research Analyst", research)
+    sequential = [research_task, _StubTask("Tech Content Strategist", writing), _StubTask("Social Media Strategist Agent", social)]
+    parallel = [
+        research_task,
+        _StubTask("Tech Content Strategist", writing, context=[research_task]),
+        _StubTask("Social Media Strategist Agent", social, context=[research_task]),
+    ]
+    for tasks in (sequential, parallel):
+        kickoff_dag(tasks).report()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,160 @@
+# crew_stream.py
+import asyncio
+import contextlib
+import threading
+import time
+
+from bench import print_table, run_async
+from crew_dag import kickoff_dag
+
+_token_sinks = set()
+_token_lock = threading.Lock()
+_token_handler = None
+
+
+def _on_stream_chunk(source, event):
+    with _token_lock:
+        sinks = list(_token_sinks)
+    for sink in sinks:
+        sink(event)
+
+
+@contextlib.contextmanager
+def _token_events(push):
+    """Forwards CrewAI's LLM stream chunk events to `push` while the block runs."""
+    global _token_handler
+    try:
+        from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+    except ImportError:  # CrewAI versions without stream events only report task outputs
+        yield
+        return
+    with _token_lock:
+        if _token_handler is None:
+            _token_handler = crewai_event_bus.on(LLMStreamChunkEvent)(_on_stream_chunk)
+        sink = lambda event: push({"type": "token", "chunk": event.chunk, "agent": getattr(event, "agent_role", None)})
+        _token_sinks.add(sink)
+    try:
+        yield
+    finally:
+        with _token_lock:
+            _token_sinks.discard(sink)
+
+
+async def astream_kickoff(crew, inputs=None, tokens=False, dag=False, max_workers=4):
+    """
+    Runs `crew.kickoff(inputs=...)` and yields each task's output as soon as the task finishes.
+
+    Events are dicts with the seconds since the start under `"elapsed"`:
+    `{"type": "task", "index": i, "output": TaskOutput}` for every finished
+    task, and `{"type": "done", "output": CrewOutput}` last. With
+    `tokens=True`, model output arrives as `{"type": "token", "chunk": ...}`
+    while the tasks run; this needs agents whose `LLM` was created with
+    `stream=True`, and tokens from other crews running at the same time are
+    included too. With `dag=True` the tasks run through `kickoff_dag`, so
+    independent tasks finish, and are yielded, concurrently.
+
+    A running crew cannot be interrupted. If the consumer stops iterating
+    early, closing the generator (`aclose()`, or the event loop shutting it
+    down) waits for the run to finish before the tasks' own callbacks are
+    restored; the events produced in the meantime are dropped.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    start = time.perf_counter()
+
+    def push(event):
+        event["elapsed"] = time.perf_counter() - start
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def on_output(i, previous):
+        def callback(output):
+            push({"type": "task", "index": i, "output": output})
+            if previous:
+                previous(output)
+        return callback
+
+    def run():
+        try:
+            with _token_events(push) if tokens else contextlib.nullcontext():
+                if dag:
+                    output = kickoff_dag(crew.tasks, inputs=inputs, max_workers=max_workers)
+                else:
+                    output = crew.kickoff(inputs=inputs)
+            push({"type": "done", "output": output})
+        except Exception as error:
+            push({"type": "error", "error": error})
+
+    callbacks = [task.callback for task in crew.tasks]
+    for i, task in enumerate(crew.tasks):
+        task.callback = on_output(i, callbacks[i])
+    worker = loop.run_in_executor(None, run)
+    try:
+        while True:
+            event = await queue.get()
+            if event["type"] == "error":
+                raise event["error"]
+            yield event
+            if event["type"] == "done":
+                break
+    finally:
+        # Restoring the callbacks while the crew still runs would leave it calling `push` on a closed loop.
+        try:
+            await worker
+        finally:
+            for task, callback in zip(crew.tasks, callbacks):
+                task.callback = callback
+
+
+class _StubCrewOutput:
+    def __init__(self, tasks_output):
+        self.tasks_output = tasks_output
+        self.raw = tasks_output[-1].raw
+
+
+class _StubCrew:
+    """Runs stub tasks one after another like a sequential `Crew`."""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    def kickoff(self, inputs=None):
+        outputs = []
+        for task in self.tasks:
+            outputs.append(task.execute_sync(context="\n\n".join(output.raw for output in outputs)))
+        return _StubCrewOutput(outputs)
+
+
+def benchmark(research=0.3, writing=0.3, social=0.2):
+    """Compares when the first task output is available with a blocking kickoff and with streaming."""
+    from crew_dag import _StubTask
+
+    research_task = _StubTask("Senior Research Analyst", research)
+    crew = _StubCrew([
+        research_task,
+        _StubTask("Tech Content Strategist", writing, context=[research_task]),
+        _StubTask("Social Media Strategist Agent", social, context=[research_task]),
+    ])
+
+    start = time.perf_counter()
+    crew.kickoff()
+    blocking = time.perf_counter() - start
+    rows = [{"mode": "kickoff", "first output s": blocking, "research s": blocking, "social s": blocking,
+             "all outputs s": blocking}]
+
+    async def stream(dag):
+        seen = {}
+        async for event in astream_kickoff(crew, dag=dag):
+            if event["type"] == "task":
+                seen[event["index"]] = event["elapsed"]
+            elif event["type"] == "done":
+                done = event["elapsed"]
+        return {"mode": "astream_kickoff" + (", dag" if dag else ""), "first output s": min(seen.values()),
+                "research s": seen[0], "social s": seen[2], "all outputs s": done}
+
+    rows += [run_async(stream(False)), run_async(stream(True))]
+    print_table("Time until task outputs are available (research -> writer, social media)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,12 @@
+# embedder_identity.py
+
+
+def embedder_identity(embedder):
+    """
+    Names the model behind `embedder` for stored vectors to be checked against.
+
+    Uses the embedder's `model_name` when it has one, and otherwise its class
+    name and dimension. Indexes and caches store this string next to their
+    vectors and rebuild or reject them when it no longer matches.
+    """
+    return getattr(embedder, "model_name", None) or f"{type(embedder).__name__}({getattr(embedder, 'dim', '')})"
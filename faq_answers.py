@@ -0,0 +1,237 @@
+# faq_answers.py
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from bench import percentile, print_table
+from embedder_identity import embedder_identity
+
+
+def normalize_question(question):
+    """Lower-cases a question and drops punctuation and extra spaces, so trivial rewordings share one key."""
+    return " ".join(re.findall(r"[a-z0-9$%']+", question.lower()))
+
+
+def _numbers(question):
+    return tuple(re.findall(r"\d+", question))
+
+
+def faq_version(source):
+    """
+    Returns the version of the FAQ: the SHA-256 recorded in a `faq_index` file, or the hash of a PDF path or URL.
+    """
+    import hashlib
+
+    from faq_index import read_header, read_source
+
+    header = read_header(source)
+    if header is not None:
+        return header["source_sha256"]
+    return hashlib.sha256(read_source(source)).hexdigest()
+
+
+class AnswerCache:
+    """
+    Front cache of approved chatbot answers, consulted before the crew runs.
+
+    A question is answered from the cache when its normalized text matches
+    a stored question exactly, or when its embedding has a cosine
+    similarity of at least `threshold` with one that mentions the same
+    numbers, since "a party of 12" and "a party of 40" embed almost
+    identically but need different answers. Only approved answers are
+    served. Answers the crew produces are stored as pending until
+    `approve` is called, unless `auto_approve=True`. Every answer records
+    the `version` of the FAQ it was produced from and the embedder that
+    produced its vector, and answers from any other version or embedder are
+    deleted when the cache is opened, so a new FAQ PDF or a new embedding
+    model invalidates them.
+    """
+
+    def __init__(self, embedder, version, path="faq_answers.sqlite", threshold=0.9, auto_approve=False):
+        self.embedder = embedder
+        self.version = version
+        self.model = embedder_identity(embedder)
+        self.threshold = threshold
+        self.auto_approve = auto_approve
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidated": 0}
+        self.latencies = {"exact": [], "semantic": [], "crew": []}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, question TEXT NOT NULL, answer TEXT NOT NULL, "
+            "vector BLOB NOT NULL, version TEXT NOT NULL, approved INTEGER NOT NULL, created REAL NOT NULL, "
+            "model TEXT NOT NULL DEFAULT '')"
+        )
+        if "model" not in {column for _, column, *_ in self._db.execute("PRAGMA table_info(answers)")}:
+            # Caches written before the embedder was recorded: their vectors count as another model's.
+            self._db.execute("ALTER TABLE answers ADD COLUMN model TEXT NOT NULL DEFAULT ''")
+        self.counters["invalidated"] = self._db.execute(
+            "DELETE FROM answers WHERE version != ? OR model != ?", (version, self.model)
+        ).rowcount
+        self._db.commit()
+        self._load()
+
+    def _load(self):
+        rows = self._db.execute("SELECT key, answer, vector FROM answers WHERE approved = 1").fetchall()
+        self._keys = [key for key, _, _ in rows]
+        self._numbers = [_numbers(key) for key in self._keys]
+        self._answers = {key: answer for key, answer, _ in rows}
+        self._vectors = np.stack([np.frombuffer(vector, dtype=np.float32) for _, _, vector in rows]) if rows else None
+
+    def lookup(self, question):
+        """Returns `(answer, kind, similarity)` where kind is "exact", "semantic" or None for a miss."""
+        key = normalize_question(question)
+        with self._lock:
+            if key in self._answers:
+                self.counters["exact_hits"] += 1
+                return self._answers[key], "exact", 1.0
+            keys, numbers, vectors, answers = self._keys, self._numbers, self._vectors, self._answers
+        if vectors is not None:
+            similarities = vectors @ np.asarray(self.embedder.embed(question), dtype=np.float32)
+            similarities[[n != _numbers(key) for n in numbers]] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                with self._lock:
+                    self.counters["semantic_hits"] += 1
+                return answers[keys[best]], "semantic", float(similarities[best])
+        with self._lock:
+            self.counters["misses"] += 1
+        return None, None, 0.0
+
+    def store(self, question, answer, approved=None):
+        approved = self.auto_approve if approved is None else approved
+        vector = np.asarray(self.embedder.embed(question), dtype=np.float32)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_question(question), question, answer, vector.tobytes(), self.version, int(approved),
+                 time.time(), self.model),
+            )
+            self._db.commit()
+            if approved:
+                self._load()
+
+    def approve(self, question, answer=None):
+        """Approves the stored answer to `question`, or stores `answer` as the approved one."""
+        if answer is not None:
+            return self.store(question, answer, approved=True)
+        with self._lock:
+            self._db.execute("UPDATE answers SET approved = 1 WHERE key = ?", (normalize_question(question),))
+            self._db.commit()
+            self._load()
+
+    def reject(self, question):
+        with self._lock:
+            self._db.execute("DELETE FROM answers WHERE key = ?", (normalize_question(question),))
+            self._db.commit()
+            self._load()
+
+    def pending(self):
+        """Lists the (question, answer) pairs produced by the crew that are waiting for approval."""
+        with self._lock:
+            return self._db.execute("SELECT question, answer FROM answers WHERE approved = 0 ORDER BY created").fetchall()
+
+    def ask(self, crew, question, input_key="customer_query"):
+        """Answers from the cache when possible, otherwise runs `crew.kickoff` and stores its answer."""
+        start = time.perf_counter()
+        answer, kind, _ = self.lookup(question)
+        if answer is None:
+            answer = str(getattr(crew.kickoff(inputs={input_key: question}), "raw", ""))
+            self.store(question, answer)
+            kind = "crew"
+        self.latencies[kind].append(time.perf_counter() - start)
+        return answer
+
+    def stats(self):
+        hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+        lookups = hits + self.counters["misses"]
+        return {**self.counters, "hit_rate": hits / lookups if lookups else 0.0, "approved": len(self._keys)}
+
+    def report(self):
+        rows = [{"answered by": kind, "questions": len(values), "p50 ms": 1000 * percentile(values, 50),
+                 "p95 ms": 1000 * percentile(values, 95)} for kind, values in self.latencies.items() if values]
+        print_table(f"FAQ answers (hit rate {self.stats()['hit_rate']:.1%})", rows)
+
+    def close(self):
+        self._db.close()
+
+
+class _StubCrewOutput:
+    def __init__(self, raw):
+        self.raw = raw
+
+
+class _StubCrew:
+    """Stands in for the task-centric crew: answers after `seconds`."""
+
+    def __init__(self, seconds=0.5):
+        self.seconds = seconds
+        self.kickoffs = 0
+
+    def kickoff(self, inputs):
+        self.kickoffs += 1
+        time.sleep(self.seconds)
+        return _StubCrewOutput(f"Answer to: {inputs['customer_query']}")
+
+
+def benchmark(questions=300, crew_seconds=0.05, threshold=0.85, seed=0, path="faq_answers_benchmark.sqlite"):
+    """
+    Replays a day of chatbot questions, most of them rewordings of a few popular ones.
+
+    The first answer to each question is approved as soon as it is
+    produced. Answers served for a different question count as wrong;
+    lowering `threshold` trades more of them for fewer crew runs.
+    Afterwards the FAQ version changes, and then the embedder, and each
+    change invalidates every cached answer.
+    """
+    import os
+    import random
+
+    from semantic_router import HashingEmbedder
+
+    rng = random.Random(seed)
+    popular = ["What are the timings?", "What is the phone number?", "What is the location?",
+               "Do you have vegan options?", "Can I book a table for tonight?"]
+    variants = [lambda q: q, lambda q: q.lower(), lambda q: q.rstrip("?") + " ??", lambda q: "hi, " + q.lower(),
+                lambda q: q.replace("What", "what exactly")]
+    stream = []
+    for _ in range(questions):
+        if rng.random() < 0.8:
+            group = rng.choice(popular)
+            stream.append((group, rng.choice(variants)(group)))
+        else:
+            group = f"Can you cater a party of {rng.randrange(1000)} guests?"
+            stream.append((group, group))
+
+    if os.path.exists(path):
+        os.remove(path)
+    crew = _StubCrew(crew_seconds)
+    answers = AnswerCache(HashingEmbedder(), version="faq-v1", path=path, threshold=threshold, auto_approve=True)
+    groups, wrong = {}, 0
+    start = time.perf_counter()
+    for group, question in stream:
+        answer = answers.ask(crew, question)
+        # An answer served for a question from another group is a false semantic match.
+        wrong += groups.setdefault(answer, group) != group
+    elapsed = time.perf_counter() - start
+    answers.report()
+    print(f"{len(stream)} questions in {elapsed:.2f}s, {crew.kickoffs} crew runs, {wrong} wrong answers "
+          f"(vs {len(stream) * crew_seconds:.2f}s and {len(stream)} runs without the cache)")
+    answers.close()
+
+    reopened = AnswerCache(HashingEmbedder(), version="faq-v2", path=path, threshold=0.8)
+    print(f"New FAQ version: {reopened.stats()['invalidated']} answers invalidated, {reopened.stats()['approved']} left")
+    reopened.ask(crew, popular[0])
+    reopened.close()
+    reembedded = AnswerCache(HashingEmbedder(dim=128), version="faq-v2", path=path, threshold=0.8)
+    print(f"New embedder: {reembedded.stats()['invalidated']} answers invalidated, {reembedded.stats()['approved']} left")
+    reembedded.close()
+    os.remove(path)
+    return answers.stats()
+
+
+if __name__ == "__main__":
+    benchmark()
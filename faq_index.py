@@ -0,0 +1,296 @@
+# faq_index.py
+import hashlib
+import json
+import os
+import re
+import struct
+import time
+import urllib.request
+
+import numpy as np
+
+from bench import print_table
+from embedder_identity import embedder_identity
+
+FORMAT_VERSION = 1
+MAGIC = b"FAQIDX"
+ALIGNMENT = 64
+FAQ_PDF_URL = "https://cf-courses-data.s3.us.cloud-object-storage.appdomain.cloud/7vgNfis17dQfjHAiIKkBOg/The-Daily-Dish-FAQ.pdf"
+
+
+def read_source(pdf, download_to=None, refresh=False):
+    """
+    Returns the bytes of `pdf`, a local path or a URL.
+
+    A URL is downloaded once to `download_to` (by default its file name in
+    the working directory) and read from there afterwards; pass
+    `refresh=True` to download it again.
+    """
+    if not re.match(r"https?://", str(pdf)):
+        with open(pdf, "rb") as f:
+            return f.read()
+    local = download_to or os.path.basename(pdf.split("?")[0])
+    if refresh or not os.path.exists(local):
+        with urllib.request.urlopen(pdf, timeout=60) as response:
+            data = response.read()
+        with open(local, "wb") as f:
+            f.write(data)
+        return data
+    with open(local, "rb") as f:
+        return f.read()
+
+
+def extract_pdf_text(data):
+    import io
+
+    from pypdf import PdfReader
+
+    return "\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages)
+
+
+def chunk_text(text, chunk_words=120, overlap=20):
+    """Splits text into windows of `chunk_words` words that overlap by `overlap` words."""
+    words = text.split()
+    step = max(1, chunk_words - overlap)
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, max(len(words) - overlap, 1), step)]
+
+
+def embed_chunks(embedder, chunks):
+    embed_batch = getattr(embedder, "embed_batch", None)
+    if embed_batch is not None:
+        return np.asarray(embed_batch(chunks), dtype=np.float32)
+    return np.stack([embedder.embed(chunk) for chunk in chunks]).astype(np.float32)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_index(path, chunks, vectors, source_hash, model, dtype="int8"):
+    """
+    Writes chunks and their vectors to one file that `FaqIndex` can memory-map.
+
+    Layout: `MAGIC`, a little-endian uint32 header length, the JSON header,
+    then at 64-byte aligned offsets the vectors (float32, or int8 with one
+    float32 scale per row), the int64 end offset of every chunk, and the
+    UTF-8 chunk texts. The file is written to a temporary name and renamed,
+    so readers never see a partial index.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape if vectors.size else (len(chunks), 0)
+    texts = [chunk.encode("utf-8") for chunk in chunks]
+    ends = np.cumsum([len(t) for t in texts], dtype=np.int64) if texts else np.zeros(0, dtype=np.int64)
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0 if count else np.zeros(0, dtype=np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        stored = [np.round(vectors / scales[:, None]).astype(np.int8), scales]
+    elif dtype == "float32":
+        stored = [vectors]
+    else:
+        raise ValueError(f"unsupported dtype {dtype!r}")
+
+    header = {"version": FORMAT_VERSION, "source_sha256": source_hash, "model": model, "dtype": dtype,
+              "count": count, "dim": dim, "built": time.time()}
+    # Offsets depend on the header length, which depends on the offsets; repeat until they settle.
+    encoded = None
+    while encoded != json.dumps(header).encode("utf-8"):
+        encoded = json.dumps(header).encode("utf-8")
+        offset = _align(len(MAGIC) + 4 + len(encoded))
+        for name, array in zip(("vectors", "scales"), stored):
+            header[f"{name}_offset"] = offset
+            offset = _align(offset + array.nbytes)
+        header["ends_offset"] = offset
+        header["texts_offset"] = _align(offset + ends.nbytes)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+        for name, array in [*zip(("vectors", "scales"), stored), ("ends", ends)]:
+            f.write(b"\0" * (header[f"{name}_offset"] - f.tell()))
+            f.write(array.tobytes())
+        f.write(b"\0" * (header["texts_offset"] - f.tell()))
+        f.write(b"".join(texts))
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path):
+    """Returns the JSON header of an index file, or None if it is missing or not an index."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (length,) = struct.unpack("<I", f.read(4))
+            return json.loads(f.read(length))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+class FaqIndex:
+    """
+    Read-only, memory-mapped view of an index file written by `write_index`.
+
+    Opening it reads only the header; vectors and texts are paged in by the
+    operating system when `search` touches them. `embedder` must be the
+    model recorded in the header and return vectors of its dimension,
+    otherwise ValueError is raised. Embedders without a `dim` attribute
+    embed one probe text to check the dimension.
+    """
+
+    def __init__(self, path, embedder):
+        self.path = path
+        self.embedder = embedder
+        self.header = read_header(path)
+        if self.header is None or self.header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} FAQ index")
+        count, dim = self.header["count"], self.header["dim"]
+        if self.header["model"] != embedder_identity(embedder):
+            raise ValueError(f"{path} was built with {self.header['model']}, not {embedder_identity(embedder)}")
+        embedder_dim = getattr(embedder, "dim", None) or len(embedder.embed("dimension check"))
+        if count and embedder_dim != dim:
+            raise ValueError(f"{path} holds {dim}-dimensional vectors but the embedder returns {embedder_dim}-dimensional ones")
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if self.header["dtype"] == "int8":
+            self.vectors = raw[self.header["vectors_offset"]:][:count * dim].view(np.int8).reshape(count, dim)
+            self.scales = raw[self.header["scales_offset"]:][:count * 4].view(np.float32)
+        else:
+            self.vectors = raw[self.header["vectors_offset"]:][:count * dim * 4].view(np.float32).reshape(count, dim)
+            self.scales = None
+        self.ends = raw[self.header["ends_offset"]:][:count * 8].view(np.int64)
+        self._texts = raw[self.header["texts_offset"]:]
+
+    def __len__(self):
+        return self.header["count"]
+
+    def chunk(self, i):
+        start = int(self.ends[i - 1]) if i else 0
+        return self._texts[start:int(self.ends[i])].tobytes().decode("utf-8")
+
+    def scores(self, vector):
+        scores = self.vectors @ vector if self.scales is None else (self.vectors @ vector) * self.scales
+        return np.asarray(scores, dtype=np.float32)
+
+    def search(self, query, k=3):
+        """Returns the `k` most similar chunks as (score, text) pairs, best first."""
+        if not len(self):
+            return []
+        scores = self.scores(np.asarray(self.embedder.embed(query), dtype=np.float32))
+        top = np.argsort(-scores)[:k]
+        return [(float(scores[i]), self.chunk(int(i))) for i in top]
+
+
+def build_index(pdf=FAQ_PDF_URL, path="faq_index.bin", embedder=None, dtype="int8", chunk_words=120, overlap=20,
+                refresh=False):
+    """
+    Makes sure `path` holds an index of `pdf` and opens it.
+
+    The index is rebuilt only when the PDF's SHA-256, the embedding model,
+    the vector dtype or the file format differ from the ones recorded in
+    its header, so a normal start reads the header, hashes the local PDF
+    and memory-maps the file. `embedder` defaults to the all-MiniLM-L6-v2
+    model the FAQ tool is configured with.
+    """
+    if embedder is None:
+        from semantic_router import SentenceTransformerEmbedder
+
+        embedder = SentenceTransformerEmbedder()
+    data = read_source(pdf, refresh=refresh)
+    source_hash = hashlib.sha256(data).hexdigest()
+    header = read_header(path)
+    model = embedder_identity(embedder)
+    expected = {"version": FORMAT_VERSION, "source_sha256": source_hash, "model": model, "dtype": dtype}
+    if header is None or any(header.get(k) != v for k, v in expected.items()):
+        chunks = chunk_text(extract_pdf_text(data), chunk_words, overlap)
+        write_index(path, chunks, embed_chunks(embedder, chunks), source_hash, model, dtype)
+    return FaqIndex(path, embedder)
+
+
+def make_faq_search_tool(index, k=3):
+    """
+    Returns a CrewAI tool that searches a `FaqIndex`, for use in place of `PDFSearchTool`.
+
+    It takes the same `query` argument and answers in the same
+    "Relevant Content" form.
+    """
+    from crewai.tools import BaseTool
+    from pydantic import BaseModel, Field, PrivateAttr
+
+    class FaqSearchSchema(BaseModel):
+        query: str = Field(..., description="Mandatory query you want to use to search the PDF's content")
+
+    class FaqSearchTool(BaseTool):
+        name: str = "Search a PDF's content"
+        description: str = "A tool that can be used to semantic search a query from The Daily Dish FAQ PDF's content."
+        args_schema: type = FaqSearchSchema
+        _index: FaqIndex = PrivateAttr(default=None)
+
+        def _run(self, query, **kwargs):
+            return "Relevant Content:\n" + "\n\n".join(text for _, text in self._index.search(query, k))
+
+    tool = FaqSearchTool()
+    tool._index = index
+    return tool
+
+
+def _synthetic_faq(questions):
+    topics = ["opening hours", "reservations", "parking", "vegan dishes", "gluten-free options", "delivery",
+              "gift cards", "private events", "allergens", "kids menu", "happy hour", "loyalty program"]
+    lines = []
+    for i in range(questions):
+        topic = topics[i % len(topics)]
+        lines.append(f"Q{i + 1}: What should I know about {topic} at The Daily Dish (question {i + 1})? "
+                     f"A: Our {topic} policy number {i + 1} covers weekdays and weekends, and the staff are happy "
+                     f"to help with {topic} by phone or at the front desk. Details vary by location {i % 7}.")
+    return "\n".join(lines)
+
+
+def benchmark(questions=400, queries=50, embedder=None, path="faq_index_benchmark.bin"):
+    """
+    Compares chatbot start-up with chunking and embedding the FAQ on every start against opening a built index.
+
+    The benchmark embeds a synthetic FAQ with `HashingEmbedder` so it needs
+    no model download. Pass `embedder=SentenceTransformerEmbedder()` to
+    measure the real model, where embedding dominates start-up even more.
+    """
+    from semantic_router import HashingEmbedder
+
+    embedder = embedder or HashingEmbedder()
+    text = _synthetic_faq(questions)
+    data = text.encode("utf-8")
+    source_hash = hashlib.sha256(data).hexdigest()
+    probes = [f"What should I know about {t} at The Daily Dish?" for t in ("parking", "vegan dishes", "delivery")]
+
+    start = time.perf_counter()
+    chunks = chunk_text(text)
+    vectors = embed_chunks(embedder, chunks)
+    embed_start = time.perf_counter() - start
+    first = [int(np.argmax(vectors @ embedder.embed(q))) for q in probes]
+
+    rows = [{"start-up": "chunk and embed on every start", "ms": 1000 * embed_start, "file KB": "-",
+             "same top chunk": "-"}]
+    for dtype in ("float32", "int8"):
+        write_index(path, chunks, vectors, source_hash, embedder_identity(embedder), dtype)
+        # What `build_index` does on a normal start: hash the source, check the header, map the file.
+        start = time.perf_counter()
+        assert read_header(path)["source_sha256"] == hashlib.sha256(data).hexdigest()
+        index = FaqIndex(path, embedder)
+        index.search(probes[0])
+        open_ms = 1000 * (time.perf_counter() - start)
+        agree = sum(int(np.argmax(index.scores(embedder.embed(q)))) == f for q, f in zip(probes, first))
+        rows.append({"start-up": f"open {dtype} index + first query", "ms": open_ms,
+                     "file KB": os.path.getsize(path) / 1024, "same top chunk": f"{agree}/{len(probes)}"})
+
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        index.search(f"Tell me about {probes[i % len(probes)]}")
+        latencies.append(time.perf_counter() - start)
+    del index
+    os.remove(path)
+    print_table(f"FAQ search cold start ({len(chunks)} chunks, {embedder_identity(embedder)})", rows)
+    print(f"int8 index search: {1000 * sum(latencies) / len(latencies):.3f} ms per query")
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,212 @@
+# fast_router.py
+import math
+import re
+import time
+from collections import Counter
+
+from bench import print_table
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+STOPWORDS = {
+    "a", "an", "the", "i", "me", "my", "to", "for", "of", "and", "or", "is", "it", "this", "that",
+    "can", "you", "please", "some", "with", "at", "in", "on", "be", "do", "want", "need", "would", "like",
+}
+
+SUMMARIZE_TRANSLATE_KEYWORDS = {
+    "summarize": [r"\bsummar(y|ize|ise|izing)\b", r"\btl;?dr\b", r"\bshorten\b", r"\bkey points\b"],
+    "translate": [r"\btranslat(e|ion|ing)\b", r"\bin french\b", r"\bto french\b"],
+}
+SUMMARIZE_TRANSLATE_EXAMPLES = {
+    "summarize": [
+        "summarize this passage for me",
+        "give me a short summary of this text",
+        "what are the key points of this article",
+        "shorten this paragraph",
+    ],
+    "translate": [
+        "translate this sentence to french",
+        "how do you say this in french",
+        "can you translate the following text",
+        "french translation of this message",
+    ],
+}
+
+SERVICE_KEYWORDS = {
+    "ride_hailing_call": [r"\b(ride|cab|taxi|uber|lyft|driver to|pick me up|drop me)\b", r"\bairport\b"],
+    "restaurant_order": [r"\b(pizzas?|burgers?|sushi|takeout|take-out|menu|restaurant|dinner order)\b", r"\border\b.*\b(food|meal)\b"],
+    "groceries": [r"\b(grocer(y|ies)|milk|bread|eggs|vegetables|fruit|supermarket)\b"],
+}
+SERVICE_EXAMPLES = {
+    "ride_hailing_call": [
+        "i need a ride from downtown to the airport",
+        "get me a cab to the train station",
+        "book a taxi for 3pm",
+        "pick me up at home and drop me at the office",
+    ],
+    "restaurant_order": [
+        "i want to order 2 large pepperoni pizzas for delivery",
+        "order a burger and fries from the diner",
+        "get me sushi takeout for dinner",
+        "can i see the menu and order food",
+    ],
+    "groceries": [
+        "i need milk bread eggs and vegetables for the week",
+        "buy groceries from the supermarket",
+        "pick up apples bananas and chicken from the store",
+        "weekly grocery shopping list",
+    ],
+}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class CentroidClassifier:
+    """TF-IDF nearest-centroid classifier trained on a few example utterances per route."""
+
+    def __init__(self, examples):
+        documents = [(route, Counter(tokenize(text))) for route, texts in examples.items() for text in texts]
+        document_frequency = Counter(term for _, counts in documents for term in counts)
+        self.idf = {term: math.log((1 + len(documents)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.centroids = {}
+        for route in examples:
+            total = Counter()
+            for doc_route, counts in documents:
+                if doc_route == route:
+                    total.update(self._vector(counts))
+            self.centroids[route] = self._normalize(total)
+
+    def _vector(self, counts):
+        return self._normalize({term: count * self.idf[term] for term, count in counts.items() if term in self.idf})
+
+    @staticmethod
+    def _normalize(vector):
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {term: value / norm for term, value in vector.items()} if norm else {}
+
+    def similarities(self, text):
+        vector = self._vector(Counter(tokenize(text)))
+        return {
+            route: sum(weight * centroid.get(term, 0.0) for term, weight in vector.items())
+            for route, centroid in self.centroids.items()
+        }
+
+
+class FastPathRouter:
+    """
+    Classifies requests locally from keyword patterns and TF-IDF similarity.
+
+    `classify` returns `(route, confidence)`. A route's score is its
+    similarity to the route's examples, plus `keyword_weight` when one of its
+    patterns matches and the similarity is at least `min_similarity`, so a
+    single incidental keyword ("what time does the airport open?") is not
+    enough on its own. The confidence is that absolute score capped at 1.
+    When the best route does not lead the runner-up by `min_margin`, or
+    nothing scores at all, it returns `(None, 0.0)` and the request should
+    go to the LLM router.
+    """
+
+    def __init__(self, keywords, examples, keyword_weight=0.5, min_similarity=0.3, min_margin=0.2):
+        self.patterns = {route: [re.compile(p, re.IGNORECASE) for p in patterns] for route, patterns in keywords.items()}
+        self.classifier = CentroidClassifier(examples)
+        self.keyword_weight = keyword_weight
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+
+    def classify(self, text):
+        scores = self.classifier.similarities(text)
+        for route, patterns in self.patterns.items():
+            if scores.get(route, 0.0) >= self.min_similarity and any(pattern.search(text) for pattern in patterns):
+                scores[route] += self.keyword_weight
+        ranked = sorted(scores.values(), reverse=True) + [0.0]
+        if not ranked[0] or ranked[0] - ranked[1] < self.min_margin:
+            return None, 0.0
+        return max(scores, key=scores.get), min(ranked[0], 1.0)
+
+
+class RouterMetrics:
+    """Counts fast-path hits and LLM fallbacks along with the time spent on each path."""
+
+    def __init__(self):
+        self.fast_hits = 0
+        self.fallbacks = 0
+        self.fast_time = 0.0
+        self.llm_time = 0.0
+
+    def summary(self):
+        total = self.fast_hits + self.fallbacks
+        mean_llm = self.llm_time / self.fallbacks if self.fallbacks else 0.0
+        mean_fast = self.fast_time / total if total else 0.0
+        return {
+            "requests": total,
+            "fast_path_hit_rate": self.fast_hits / total if total else 0.0,
+            "mean_fast_path_ms": 1000 * mean_fast,
+            "mean_llm_route_ms": 1000 * mean_llm,
+            # Without any fallback there is no LLM latency to compare against.
+            "estimated_seconds_saved": max(self.fast_hits * (mean_llm - mean_fast), 0.0) if self.fallbacks else "n/a",
+        }
+
+
+def make_tiered_router_node(fast_router, llm_router_node, threshold=0.75, metrics=None):
+    """
+    Puts `fast_router` in front of an existing LLM router node.
+
+    Requests classified with confidence of at least `threshold` are routed
+    locally; everything else is handed to `llm_router_node` unchanged.
+    """
+    metrics = metrics if metrics is not None else RouterMetrics()
+
+    def tiered_router_node(state):
+        start = time.perf_counter()
+        route, confidence = fast_router.classify(state["user_input"])
+        metrics.fast_time += time.perf_counter() - start
+        if route is not None and confidence >= threshold:
+            metrics.fast_hits += 1
+            return {"task_type": route}
+        start = time.perf_counter()
+        result = llm_router_node(state)
+        metrics.llm_time += time.perf_counter() - start
+        metrics.fallbacks += 1
+        return result
+
+    tiered_router_node.metrics = metrics
+    return tiered_router_node
+
+
+def benchmark(latency=0.3, threshold=0.75):
+    """Routes a mixed set of requests through the tiered router with a stub LLM router."""
+    from stub_llm import StubChatModel
+
+    llm_router = StubChatModel(
+        latency=latency,
+        tool_calls=lambda prompt: [{"name": "Router", "args": {"role": "default_handler"}, "id": "stub"}],
+    ).bind_tools(["Router"])
+
+    def router_node(state):
+        response = llm_router.invoke(state["user_input"])
+        return {"task_type": response.tool_calls[0]["args"]["role"]}
+
+    node = make_tiered_router_node(FastPathRouter(SERVICE_KEYWORDS, SERVICE_EXAMPLES), router_node, threshold)
+    requests = [
+        "I need a ride from downtown to the airport at 3pm",
+        "Get me a cab to the stadium",
+        "I want to order 2 large pepperoni pizzas for delivery",
+        "Order sushi takeout for four people",
+        "I need milk, bread, eggs, and vegetables for the week",
+        "Pick up some fruit and yogurt from the supermarket",
+        "What's the weather like today?",
+        "Can you help me with my account?",
+        "Order new running shoes online",
+        "What time does the airport open?",
+        "Is the store open on Sunday?",
+    ]
+    for request in requests * 5:
+        node({"user_input": request})
+    summary = node.metrics.summary()
+    print_table(f"Tiered router (threshold={threshold}, stub LLM latency={latency}s)", [summary])
+    return summary
+
+
+if __name__ == "__main__":
+    benchmark()
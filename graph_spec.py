@@ -0,0 +1,302 @@
+# graph_spec.py
+import functools
+import hashlib
+import inspect
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from typing import TypedDict
+
+from bench import percentile, print_table
+
+START, END = "__start__", "__end__"
+FIELD_TYPES = {"str": str, "int": int, "float": float, "bool": bool, "dict": dict, "list": list}
+
+
+def print_workflow_info(workflow, app=None, show_graph=False):
+    """
+    Prints the nodes and edges of a LangGraph workflow.
+
+    IPython and the PNG renderer (pygraphviz) are only imported when
+    `show_graph=True`, so short-lived worker processes never load them.
+    """
+    print("WORKFLOW INFORMATION")
+    print("====================")
+    print(f"Nodes: {workflow.nodes}")
+    print(f"Edges: {workflow.edges}")
+    finish_points = sorted(source for source, target in workflow.edges if target == END)
+    print(f"Finish points: {finish_points}")
+    if app is not None and show_graph:
+        from IPython.display import Image, display
+
+        print("\nWorkflow Visualization:")
+        display(Image(app.get_graph().draw_png()))
+
+
+def _reference(function, namespace=None):
+    """
+    Names `function` so it can be found again in another process.
+
+    Module-level functions become "module:name"; anything else, such as a
+    closure returned by a factory, is named after the variable it is bound to
+    in `namespace`.
+    """
+    name = getattr(function, "__name__", None) or type(function).__name__
+    module = getattr(function, "__module__", None)
+    if module not in (None, "__main__") and getattr(sys.modules.get(module), name, None) is function:
+        return f"{module}:{name}"
+    for variable, value in (namespace or {}).items():
+        if value is function:
+            return variable
+    return name
+
+
+def _function(runnable):
+    # LangGraph keeps the sync function in `func` and an async one in `afunc`.
+    return runnable.func or runnable.afunc
+
+
+def graph_spec(workflow, namespace=None):
+    """Describes a `StateGraph` as a JSON-serializable spec of its state, nodes and edges."""
+    state = workflow.state_schema
+    spec = {
+        "state": {
+            "name": _reference(state, namespace),
+            "fields": {field: getattr(tp, "__name__", str(tp)) for field, tp in state.__annotations__.items()},
+        },
+        "nodes": {name: _reference(_function(node.runnable), namespace) for name, node in workflow.nodes.items()},
+        "edges": sorted([source, target] for source, target in workflow.edges),
+        "branches": [
+            {"source": source, "path": _reference(_function(branch.path), namespace), "ends": dict(branch.ends or {})}
+            for source, branches in sorted(workflow.branches.items())
+            for branch in branches.values()
+        ],
+    }
+    return spec
+
+
+def spec_hash(spec):
+    body = {key: value for key, value in spec.items() if key != "hash"}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def validate_spec(spec, namespace=None):
+    """
+    Returns a list of problems with the spec; an empty list means it is valid.
+
+    Besides the graph structure, every node and conditional-edge reference
+    must resolve through `namespace` or an import to a function that is not
+    a builtin, so a spec that `build_from_spec` cannot load is never saved.
+    """
+    errors = []
+    references = [(f"node {name!r}", reference) for name, reference in spec["nodes"].items()]
+    references += [(f"conditional edge from {branch['source']!r}", branch["path"]) for branch in spec["branches"]]
+    for owner, reference in references:
+        try:
+            function = _resolve(reference, namespace)
+        except (KeyError, ImportError, AttributeError):
+            errors.append(f"{owner} references {reference!r}, which cannot be resolved")
+            continue
+        if not callable(function) or inspect.isbuiltin(function) or getattr(function, "__module__", None) == "builtins":
+            errors.append(f"{owner} references {reference!r}, which is not a node function")
+    nodes = set(spec["nodes"])
+    known = nodes | {START, END}
+    successors = {name: set() for name in known}
+    for source, target in spec["edges"]:
+        for endpoint in (source, target):
+            if endpoint not in known:
+                errors.append(f"edge {source} -> {target} references unknown node {endpoint!r}")
+        successors.setdefault(source, set()).add(target)
+    for branch in spec["branches"]:
+        if branch["source"] not in nodes:
+            errors.append(f"conditional edge from unknown node {branch['source']!r}")
+        for target in branch["ends"].values():
+            if target not in known:
+                errors.append(f"conditional edge from {branch['source']} targets unknown node {target!r}")
+            successors.setdefault(branch["source"], set()).add(target)
+    if not successors.get(START):
+        errors.append("graph has no entry point")
+    reachable, frontier = {START}, [START]
+    while frontier:
+        for target in successors.get(frontier.pop(), ()):
+            if target not in reachable:
+                reachable.add(target)
+                frontier.append(target)
+    errors.extend(f"node {name!r} is unreachable from the entry point" for name in sorted(nodes - reachable))
+    if END not in reachable:
+        errors.append("graph has no reachable finish point")
+    return errors
+
+
+def save_spec(workflow, path, namespace=None):
+    """Validates the workflow's spec and writes it to `path` together with its content hash."""
+    spec = graph_spec(workflow, namespace)
+    errors = validate_spec(spec, namespace)
+    if errors:
+        raise ValueError("invalid workflow: " + "; ".join(errors))
+    spec["hash"] = spec_hash(spec)
+    with open(path, "w") as f:
+        json.dump(spec, f, indent=1, sort_keys=True)
+    return spec
+
+
+def load_spec(path):
+    """Reads a spec written by `save_spec`; the stored hash must match its contents."""
+    with open(path) as f:
+        spec = json.load(f)
+    if spec.get("hash") != spec_hash(spec):
+        raise ValueError(f"{path} was modified after it was validated")
+    return spec
+
+
+def _resolve(reference, namespace):
+    if ":" not in reference:
+        if namespace is None or reference not in namespace:
+            raise KeyError(f"{reference!r} must be passed in the namespace")
+        return namespace[reference]
+    module, _, name = reference.partition(":")
+    return getattr(__import__(module, fromlist=[name]), name)
+
+
+def build_from_spec(spec, namespace=None):
+    """Rebuilds and compiles the workflow described by `spec`, resolving functions by name."""
+    from langgraph.graph import StateGraph
+
+    try:
+        state = _resolve(spec["state"]["name"], namespace)
+    except (KeyError, ImportError, AttributeError):
+        state = TypedDict("State", {field: FIELD_TYPES.get(tp, str) for field, tp in spec["state"]["fields"].items()})
+    workflow = StateGraph(state)
+    for name, reference in spec["nodes"].items():
+        workflow.add_node(name, _resolve(reference, namespace))
+    for source, target in spec["edges"]:
+        workflow.add_edge(source, target)
+    for branch in spec["branches"]:
+        workflow.add_conditional_edges(branch["source"], _resolve(branch["path"], namespace), branch["ends"])
+    return workflow.compile()
+
+
+_namespaces = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_app(path, mtime, namespace_key):
+    return build_from_spec(load_spec(path), _namespaces[namespace_key])
+
+
+def get_app(path, namespace=None):
+    """Returns the compiled app for the spec at `path`, building it at most once per process."""
+    namespace_key = id(namespace)
+    _namespaces[namespace_key] = namespace
+    return _cached_app(os.path.abspath(path), os.path.getmtime(path), namespace_key)
+
+
+STARTUP_NODES = textwrap.dedent("""
+    import time
+    start = time.perf_counter()
+    from typing import TypedDict
+    from langgraph.graph import StateGraph
+    from stub_llm import StubChatModel
+    imported = time.perf_counter()
+
+    llm = StubChatModel(latency=0.0)
+
+    class RouterState(TypedDict):
+        user_input: str
+        task_type: str
+        output: str
+
+    def router_node(state):
+        return {"task_type": "summarize"}
+
+    def router(state):
+        return state["task_type"]
+
+    def summarize_node(state):
+        return {"output": llm.invoke(state["user_input"]).content}
+
+    def translate_node(state):
+        return {"output": llm.invoke(state["user_input"]).content}
+""")
+
+STARTUP_EAGER = STARTUP_NODES + textwrap.dedent("""
+    from IPython.display import Image, display
+    try:
+        import pygraphviz
+    except ImportError:
+        pass
+    imported = time.perf_counter()
+    workflow = StateGraph(RouterState)
+    workflow.add_node("router", router_node)
+    workflow.add_node("summarize", summarize_node)
+    workflow.add_node("translate", translate_node)
+    workflow.set_entry_point("router")
+    workflow.add_conditional_edges("router", router, {"summarize": "summarize", "translate": "translate"})
+    workflow.set_finish_point("summarize")
+    workflow.set_finish_point("translate")
+    app = workflow.compile()
+    app.get_graph().draw_mermaid()
+    built = time.perf_counter()
+    app.invoke({"user_input": "summarize this"})
+    done = time.perf_counter()
+    print(imported - start, built - imported, done - built)
+""")
+
+STARTUP_SPEC = STARTUP_NODES + textwrap.dedent("""
+    from graph_spec import get_app
+    imported = time.perf_counter()
+    app = get_app(SPEC_PATH, globals())
+    built = time.perf_counter()
+    app.invoke({"user_input": "summarize this"})
+    done = time.perf_counter()
+    print(imported - start, built - imported, done - built)
+""")
+
+
+def benchmark_startup(runs=5, spec_path="router_spec.json"):
+    """
+    Measures import-to-first-invoke time in fresh interpreters.
+
+    "eager" imports IPython and the graph renderer and builds the graph by
+    hand as the notebook does; "spec" loads the saved, validated spec and
+    imports nothing beyond LangGraph.
+    """
+    namespace = {}
+    exec(STARTUP_NODES, namespace)
+    from langgraph.graph import StateGraph
+
+    workflow = StateGraph(namespace["RouterState"])
+    workflow.add_node("router", namespace["router_node"])
+    workflow.add_node("summarize", namespace["summarize_node"])
+    workflow.add_node("translate", namespace["translate_node"])
+    workflow.set_entry_point("router")
+    workflow.add_conditional_edges("router", namespace["router"], {"summarize": "summarize", "translate": "translate"})
+    workflow.set_finish_point("summarize")
+    workflow.set_finish_point("translate")
+    save_spec(workflow, spec_path, namespace)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for name, script in (("eager", STARTUP_EAGER), ("spec", f"SPEC_PATH = {os.path.abspath(spec_path)!r}\n" + STARTUP_SPEC)):
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", script], cwd=here, capture_output=True, text=True, check=True)
+            wall = time.perf_counter() - start
+            samples.append([wall, *map(float, output.stdout.split())])
+        rows.append({
+            "mode": name,
+            "process s": percentile([s[0] for s in samples], 50),
+            "imports s": percentile([s[1] for s in samples], 50),
+            "build s": percentile([s[2] for s in samples], 50),
+            "first invoke s": percentile([s[3] for s in samples], 50),
+        })
+    print_table(f"Import-to-first-invoke time (median of {runs} fresh processes)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark_startup()
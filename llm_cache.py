@@ -0,0 +1,284 @@
+# llm_cache.py
+import asyncio
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from stub_llm import StubMessage
+
+try:
+    from langchain_core.messages import AIMessage
+except ImportError:  # the cache also works with the stub model alone
+    AIMessage = None
+
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+def no_cache(node):
+    """Wraps a LangGraph node so that model calls made inside it skip the cache."""
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state):
+            token = _bypass.set(True)
+            try:
+                return await node(state)
+            finally:
+                _bypass.reset(token)
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state):
+        token = _bypass.set(True)
+        try:
+            return node(state)
+        finally:
+            _bypass.reset(token)
+    return wrapper
+
+
+def _render_prompt(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    if hasattr(prompt, "to_messages"):
+        prompt = prompt.to_messages()
+    return [[getattr(m, "type", ""), getattr(m, "content", str(m))] for m in prompt]
+
+
+def _model_identity(llm):
+    """Collects the model name and sampling parameters that change a completion."""
+    bound = getattr(llm, "bound", llm)
+    identity = {"model": getattr(bound, "model_name", None) or getattr(bound, "model", None) or type(bound).__name__}
+    for name in ("temperature", "top_p", "max_tokens", "seed"):
+        if getattr(bound, name, None) is not None:
+            identity[name] = getattr(bound, name)
+    identity.update(getattr(llm, "kwargs", {}) or {})
+    return identity
+
+
+def cache_key(llm, prompt):
+    """Hashes (model, parameters, rendered prompt) into a content address."""
+    payload = json.dumps([_model_identity(llm), _render_prompt(prompt)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _dump_message(message):
+    return json.dumps({"content": message.content, "tool_calls": list(getattr(message, "tool_calls", None) or [])})
+
+
+def _load_message(value):
+    data = json.loads(value)
+    if AIMessage is not None:
+        return AIMessage(content=data["content"], tool_calls=data["tool_calls"], response_metadata={"cache_hit": True})
+    return StubMessage(data["content"], data["tool_calls"], response_metadata={"cache_hit": True})
+
+
+class ResponseCache:
+    """
+    Two-tier response store: an in-memory LRU in front of an optional SQLite file.
+
+    Entries older than `ttl` seconds are treated as misses. Each tier is
+    trimmed to its size limit by evicting the least recently used entries.
+    """
+
+    def __init__(self, path=None, max_entries=1024, max_disk_entries=100_000, ttl=None):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.counters["disk_hits"] += 1
+                    return row[0]
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, now, now))
+                self._trim_disk(now)
+                self._db.commit()
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _trim_disk(self, now):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_disk_entries:
+            excess = count - self.max_disk_entries
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self.counters["evictions"] += excess
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self):
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {**self.counters, "hit_rate": hits / lookups if lookups else 0.0, "memory_entries": len(self._memory)}
+
+
+class CachedChatModel:
+    """
+    Wraps a chat model so identical requests are answered from a `ResponseCache`.
+
+    Use it in place of `llm`; `bind_tools` returns a cached wrapper around the
+    bound model, so `llm_router` shares the same cache. `stream` and `astream`
+    use the cache too, so a `StreamingChatModel` on top keeps the hits. Calls
+    made from nodes wrapped with `no_cache`, or with `enabled=False`, go
+    straight to the model.
+    """
+
+    def __init__(self, llm, cache=None, enabled=True):
+        self.llm = llm
+        self.cache = cache if cache is not None else ResponseCache()
+        self.enabled = enabled
+
+    def _use_cache(self):
+        return self.enabled and not _bypass.get()
+
+    def invoke(self, prompt, config=None, **kwargs):
+        if not self._use_cache():
+            return self.llm.invoke(prompt, config, **kwargs)
+        key = cache_key(self.llm, prompt)
+        value = self.cache.get(key)
+        if value is not None:
+            return _load_message(value)
+        response = self.llm.invoke(prompt, config, **kwargs)
+        self.cache.put(key, _dump_message(response))
+        return response
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        if not self._use_cache():
+            return await self.llm.ainvoke(prompt, config, **kwargs)
+        key = cache_key(self.llm, prompt)
+        value = self.cache.get(key)
+        if value is not None:
+            return _load_message(value)
+        response = await self.llm.ainvoke(prompt, config, **kwargs)
+        self.cache.put(key, _dump_message(response))
+        return response
+
+    def stream(self, prompt, config=None, **kwargs):
+        """Streams from the model on a miss and stores the joined message; a hit is replayed as one chunk."""
+        if not self._use_cache():
+            yield from self.llm.stream(prompt, config, **kwargs)
+            return
+        key = cache_key(self.llm, prompt)
+        value = self.cache.get(key)
+        if value is not None:
+            yield _load_message(value)
+            return
+        message = None
+        for chunk in self.llm.stream(prompt, config, **kwargs):
+            message = chunk if message is None else message + chunk
+            yield chunk
+        # Only complete streams are stored; a consumer that stops early leaves the cache untouched.
+        if message is not None:
+            self.cache.put(key, _dump_message(message))
+
+    async def astream(self, prompt, config=None, **kwargs):
+        if not self._use_cache():
+            async for chunk in self.llm.astream(prompt, config, **kwargs):
+                yield chunk
+            return
+        key = cache_key(self.llm, prompt)
+        value = self.cache.get(key)
+        if value is not None:
+            yield _load_message(value)
+            return
+        message = None
+        async for chunk in self.llm.astream(prompt, config, **kwargs):
+            message = chunk if message is None else message + chunk
+            yield chunk
+        if message is not None:
+            self.cache.put(key, _dump_message(message))
+
+    def batch(self, prompts, config=None, **kwargs):
+        return [self.invoke(prompt, config, **kwargs) for prompt in prompts]
+
+    async def abatch(self, prompts, config=None, **kwargs):
+        return await asyncio.gather(*(self.ainvoke(prompt, config, **kwargs) for prompt in prompts))
+
+    def bind_tools(self, tools, **kwargs):
+        return CachedChatModel(self.llm.bind_tools(tools, **kwargs), self.cache, self.enabled)
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def benchmark(requests=200, distinct=20, latency=0.05):
+    """Replays repeated prompts through a cached stub model and prints hit rate and latency."""
+    from bench import print_table
+    from stub_llm import StubChatModel
+
+    llm = CachedChatModel(StubChatModel(latency=latency), ResponseCache(max_entries=distinct))
+    prompts = [f"Translate the following text to French:\n\nSentence {i % distinct}" for i in range(requests)]
+    hit_times, miss_times = [], []
+    for prompt in prompts:
+        misses = llm.cache.counters["misses"]
+        start = time.perf_counter()
+        llm.invoke(prompt)
+        elapsed = time.perf_counter() - start
+        (miss_times if llm.cache.counters["misses"] > misses else hit_times).append(elapsed)
+
+    stats = llm.cache.stats()
+    print_table(f"Response cache over {requests} requests ({distinct} distinct prompts)", [
+        {"path": "miss", "calls": len(miss_times), "mean ms": 1000 * sum(miss_times) / max(len(miss_times), 1)},
+        {"path": "hit", "calls": len(hit_times), "mean ms": 1000 * sum(hit_times) / max(len(hit_times), 1)},
+    ])
+    print(f"hit rate: {stats['hit_rate']:.1%}, model calls: {llm.llm.calls}")
+    return stats
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,230 @@
+# parallel_translation.py
+import asyncio
+import time
+from typing import Annotated, TypedDict
+
+from bench import percentile, print_table, run_async
+from stub_llm import StubChatModel
+
+DEFAULT_LANGUAGES = ["French", "Spanish", "Japanese"]
+
+
+class BoundedExecutor:
+    """Runs coroutines concurrently with at most `max_concurrency` in flight at once."""
+
+    def __init__(self, max_concurrency=8):
+        self.max_concurrency = max_concurrency
+        self._loop = None
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # A semaphore is bound to the event loop it is first used on, so a new
+        # one is created whenever the executor is reused from another loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, coro):
+        async with self._get_semaphore():
+            return await coro
+
+    async def map(self, fn, items):
+        return await asyncio.gather(*(self.run(fn(item)) for item in items))
+
+
+def make_translate_node(llm, language, executor=None):
+    """Returns an async LangGraph node that translates `state['text']` into `language`."""
+    field = language.lower()
+
+    async def translate(state: dict) -> dict:
+        prompt = f"Translate the following text to {language}:\n\n{state['text']}"
+        call = llm.ainvoke(prompt)
+        response = await (executor.run(call) if executor else call)
+        return {field: response.content.strip()}
+
+    translate.__name__ = f"translate_{field}"
+    return translate
+
+
+def make_aggregator(languages):
+    """Returns an aggregator node that combines one translation field per language."""
+
+    def aggregator(state: dict) -> dict:
+        combined = f"Original Text: {state['text']}\n\n"
+        combined += "\n\n".join(f"{language}: {state[language.lower()]}" for language in languages)
+        return {"combined_output": combined + "\n"}
+
+    return aggregator
+
+
+def make_state_type(languages):
+    """Builds the graph state TypedDict with one string field per language."""
+    fields = {"text": str, **{language.lower(): str for language in languages}, "combined_output": str}
+    return TypedDict("State", fields)
+
+
+def build_parallel_graph(llm, languages=DEFAULT_LANGUAGES, max_concurrency=None):
+    """
+    Compiles the START -> translators -> aggregator graph with async translator nodes.
+
+    Run it with `app.ainvoke(...)` so the branches overlap; `max_concurrency`
+    caps how many model calls are in flight at once.
+    """
+    from langgraph.graph import END, START, StateGraph
+
+    executor = BoundedExecutor(max_concurrency) if max_concurrency else None
+    graph = StateGraph(make_state_type(languages))
+    for language in languages:
+        node = f"translate_{language.lower()}"
+        graph.add_node(node, make_translate_node(llm, language, executor))
+        graph.add_edge(START, node)
+        graph.add_edge(node, "aggregator")
+    graph.add_node("aggregator", make_aggregator(languages))
+    graph.add_edge("aggregator", END)
+    return graph.compile()
+
+
+def merge_translations(left: dict, right: dict) -> dict:
+    """Reducer that merges per-locale translation dicts from concurrent branches."""
+    return {**(left or {}), **(right or {})}
+
+
+class MapReduceState(TypedDict):
+    text: str
+    locales: list[str]
+    translations: Annotated[dict, merge_translations]
+    combined_output: str
+
+
+class LocaleTask(TypedDict):
+    text: str
+    locale: str
+
+
+def make_locale_node(llm, executor=None):
+    """Returns the async map node that translates one `LocaleTask` sent by the fan-out."""
+
+    async def translate_locale(task: LocaleTask) -> dict:
+        prompt = f"Translate the following text to {task['locale']}:\n\n{task['text']}"
+        call = llm.ainvoke(prompt)
+        response = await (executor.run(call) if executor else call)
+        return {"translations": {task["locale"]: response.content.strip()}}
+
+    return translate_locale
+
+
+def fan_out(state: MapReduceState):
+    """Sends one translation task per requested locale, or goes straight to the reduce step if there are none."""
+    from langgraph.types import Send
+
+    if not state["locales"]:
+        return "reduce"
+    return [Send("translate_locale", {"text": state["text"], "locale": locale}) for locale in state["locales"]]
+
+
+def reduce_translations(state: MapReduceState) -> dict:
+    translations = state.get("translations") or {}
+    combined = f"Original Text: {state['text']}\n\n"
+    combined += "\n\n".join(f"{locale}: {translations[locale]}" for locale in state["locales"])
+    return {"combined_output": combined + "\n"}
+
+
+def build_map_reduce_graph(llm, max_concurrency=16):
+    """
+    Compiles a data-driven translation graph for any number of locales.
+
+    The input is `{"text": ..., "locales": [...]}`; the translations are
+    reduced into `state["translations"]`, a dict keyed by locale.
+    """
+    from langgraph.graph import END, START, StateGraph
+
+    executor = BoundedExecutor(max_concurrency) if max_concurrency else None
+    graph = StateGraph(MapReduceState)
+    graph.add_node("translate_locale", make_locale_node(llm, executor))
+    graph.add_node("reduce", reduce_translations)
+    graph.add_conditional_edges(START, fan_out, ["translate_locale", "reduce"])
+    graph.add_edge("translate_locale", "reduce")
+    graph.add_edge("reduce", END)
+    return graph.compile()
+
+
+async def stream_translations(app, text, locales):
+    """Yields `(locale, translation)` pairs from a map-reduce graph as each branch finishes."""
+    async for update in app.astream({"text": text, "locales": locales}, stream_mode="updates"):
+        for locale, translation in update.get("translate_locale", {}).get("translations", {}).items():
+            yield locale, translation
+
+
+def benchmark_map_reduce(locale_counts=(1, 10, 50), latency=0.3, jitter=0.2, max_concurrency=16):
+    """Measures throughput and time-to-first-locale for the streamed map-reduce graph against a stub model."""
+    text = "Good morning! I hope you have a wonderful day."
+
+    async def run(count):
+        app = build_map_reduce_graph(StubChatModel(latency=latency, jitter=jitter), max_concurrency)
+        locales = [f"locale-{i:02d}" for i in range(count)]
+        start = time.perf_counter()
+        arrivals = []
+        async for _ in stream_translations(app, text, locales):
+            arrivals.append(time.perf_counter() - start)
+        return arrivals, time.perf_counter() - start
+
+    rows = []
+    for count in locale_counts:
+        arrivals, total = run_async(run(count))
+        if not arrivals:
+            # No locales: the graph goes straight to the reduce step.
+            rows.append({"locales": count, "seconds": total, "locales/s": 0.0, "first locale s": "-",
+                         "p95 arrival s": "-"})
+            continue
+        rows.append({
+            "locales": count,
+            "seconds": arrivals[-1],
+            "locales/s": count / arrivals[-1],
+            "first locale s": arrivals[0],
+            "p95 arrival s": percentile(arrivals, 95),
+        })
+    print_table(f"Map-reduce translation (max_concurrency={max_concurrency})", rows)
+    return rows
+
+
+def benchmark(languages=DEFAULT_LANGUAGES, latency=0.3, jitter=0.2, max_concurrency=8):
+    """
+    Compares sequential `invoke` calls with the compiled parallel graph against a stub model.
+
+    The graph's end-to-end time should track the slowest branch rather than
+    the sum of all branches; the difference is LangGraph's scheduling overhead.
+    """
+    text = "Good morning! I hope you have a wonderful day."
+
+    llm = StubChatModel(latency=latency, jitter=jitter)
+    start = time.perf_counter()
+    branch_times = []
+    for language in languages:
+        branch_start = time.perf_counter()
+        llm.invoke(f"Translate the following text to {language}:\n\n{text}")
+        branch_times.append(time.perf_counter() - branch_start)
+    sequential = time.perf_counter() - start
+
+    app = build_parallel_graph(StubChatModel(latency=latency, jitter=jitter), languages, max_concurrency)
+    start = time.perf_counter()
+    run_async(app.ainvoke({"text": text}))
+    concurrent = time.perf_counter() - start
+
+    print_table(
+        f"Fan-out over {len(languages)} languages (max_concurrency={max_concurrency})",
+        [
+            {"mode": "sequential", "seconds": sequential},
+            {"mode": "parallel graph", "seconds": concurrent},
+            {"mode": "slowest branch", "seconds": max(branch_times)},
+            {"mode": "sum of branches", "seconds": sum(branch_times)},
+        ],
+    )
+    return {"sequential": sequential, "concurrent": concurrent, "slowest_branch": max(branch_times)}
+
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark(languages=[f"Language{i}" for i in range(12)], max_concurrency=4)
+    benchmark_map_reduce()
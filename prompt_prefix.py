@@ -0,0 +1,217 @@
+# prompt_prefix.py
+import contextlib
+import contextvars
+import json
+import threading
+import time
+
+from bench import print_table
+
+_current_request = contextvars.ContextVar("prompt_prefix_request", default=None)
+
+
+def count_tokens(text):
+    """Counts tokens with tiktoken when it is installed, otherwise estimates four characters per token."""
+    try:
+        import tiktoken
+    except ImportError:
+        return len(text) // 4
+    return len(tiktoken.get_encoding("o200k_base").encode(text))
+
+
+def _render(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    if hasattr(prompt, "to_messages"):
+        prompt = prompt.to_messages()
+    return "".join(f"{getattr(m, 'type', '')}: {getattr(m, 'content', m)}\n" for m in prompt)
+
+
+def _tools_key(llm):
+    """Tool definitions are sent ahead of the messages, so they are part of the provider's prefix."""
+    kwargs = getattr(llm, "kwargs", None)
+    tools = kwargs.get("tools") if isinstance(kwargs, dict) else getattr(llm, "tools", None)
+    return json.dumps(tools or None, sort_keys=True, default=str)
+
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class PrefixLedger:
+    """
+    Accounts, per request, for the input tokens a provider prompt cache could serve.
+
+    Every prompt is compared with the prompts sent during the last `ttl`
+    seconds with the same tools bound; the longest byte-identical prefix is
+    "shared". Following OpenAI's rules, only prompts whose shared prefix
+    reaches `min_prefix_tokens` are cached, in steps of `increment` tokens,
+    and the rest of the prompt is billed as fresh input. When the provider
+    reports cached tokens in `usage_metadata` they are recorded alongside.
+    """
+
+    def __init__(self, min_prefix_tokens=1024, increment=128, ttl=300, max_prompts=256):
+        self.min_prefix_tokens = min_prefix_tokens
+        self.increment = increment
+        self.ttl = ttl
+        self.max_prompts = max_prompts
+        self.requests = []
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def cacheable_tokens(self, shared_tokens):
+        if shared_tokens < self.min_prefix_tokens:
+            return 0
+        return self.min_prefix_tokens + (shared_tokens - self.min_prefix_tokens) // self.increment * self.increment
+
+    def record(self, prompt, tools_key="null", usage=None):
+        text = _render(prompt)
+        now = time.monotonic()
+        with self._lock:
+            history = [(at, seen) for at, seen in self._history.get(tools_key, []) if now - at <= self.ttl]
+            shared = max((_common_prefix(text, seen) for _, seen in history), default=0)
+            history.append((now, text))
+            self._history[tools_key] = history[-self.max_prompts:]
+        shared_tokens = count_tokens(text[:shared])
+        entry = {
+            "input": count_tokens(text),
+            "shared": shared_tokens,
+            "cacheable": self.cacheable_tokens(shared_tokens),
+            "provider_cached": ((usage or {}).get("input_token_details") or {}).get("cache_read"),
+        }
+        request = _current_request.get()
+        if request is not None:
+            request["calls"].append(entry)
+        return entry
+
+    def wrap_llm(self, llm):
+        return PrefixTrackingChatModel(llm, self)
+
+    @contextlib.contextmanager
+    def request(self, name="request"):
+        """Attributes the model calls made inside the block to one request."""
+        request = {"name": name, "calls": []}
+        self.requests.append(request)
+        token = _current_request.set(request)
+        try:
+            yield request
+        finally:
+            _current_request.reset(token)
+
+    def invoke(self, app, inputs, config=None, name="request"):
+        with self.request(name):
+            return app.invoke(inputs, config)
+
+    def rows(self):
+        rows = []
+        for request in self.requests:
+            calls = request["calls"]
+            total = sum(c["input"] for c in calls)
+            cacheable = sum(c["cacheable"] for c in calls)
+            reported = [c["provider_cached"] for c in calls if c["provider_cached"] is not None]
+            rows.append({
+                "request": request["name"],
+                "calls": len(calls),
+                "input tokens": total,
+                "shared prefix": sum(c["shared"] for c in calls),
+                "cacheable": cacheable,
+                "fresh": total - cacheable,
+                "cacheable %": f"{cacheable / total:.0%}" if total else "-",
+                "provider cached": sum(reported) if reported else "-",
+            })
+        return rows
+
+    def report(self, title="Input tokens per request"):
+        print_table(f"{title} (cache minimum {self.min_prefix_tokens} tokens)", self.rows())
+
+
+class PrefixTrackingChatModel:
+    """Wraps a chat model so every prompt that reaches the provider is recorded in a `PrefixLedger`."""
+
+    def __init__(self, llm, ledger):
+        self.llm = llm
+        self.ledger = ledger
+
+    def _record(self, prompt, response):
+        if not (getattr(response, "response_metadata", None) or {}).get("cache_hit"):
+            self.ledger.record(prompt, _tools_key(self.llm), getattr(response, "usage_metadata", None))
+        return response
+
+    def invoke(self, prompt, config=None, **kwargs):
+        return self._record(prompt, self.llm.invoke(prompt, config, **kwargs))
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        return self._record(prompt, await self.llm.ainvoke(prompt, config, **kwargs))
+
+    def bind_tools(self, tools, **kwargs):
+        return PrefixTrackingChatModel(self.llm.bind_tools(tools, **kwargs), self.ledger)
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def benchmark(count=5, description_words=1500):
+    """
+    Compares the original prompt layout with the shared-prefix layout on the prompt chain.
+
+    The original prompts put each node's instructions before the job
+    description, so the two calls of a request share no prefix; the new
+    layout starts both with the job description.
+    """
+    from prompts import cover_letter_prompt, resume_summary_prompt
+    from stub_llm import StubChatModel
+
+    def original_resume_summary_prompt(state):
+        return f"""
+You're a resume assistant. Read the following job description and summarize the key qualifications and experience the ideal candidate should have, phrased as if from the perspective of a strong applicant's resume summary.
+
+Job Description:
+{state['job_description']}
+"""
+
+    def original_cover_letter_prompt(state):
+        return f"""
+You're a cover letter writing assistant. Using the resume summary below, write a professional and personalized cover letter for the following job.
+
+Resume Summary:
+{state['resume_summary']}
+
+Job Description:
+{state['job_description']}
+"""
+
+    words = " ".join(["Python, NLP, MLOps and stakeholder communication"] * (description_words // 6))
+    inputs = [{"job_description": f"Job {i}: data scientist. Requirements: {words}"} for i in range(count)]
+    totals = []
+    for layout, summary_prompt, letter_prompt in (
+        ("original", original_resume_summary_prompt, original_cover_letter_prompt),
+        ("shared prefix", resume_summary_prompt, cover_letter_prompt),
+    ):
+        ledger = PrefixLedger()
+        llm = ledger.wrap_llm(StubChatModel(latency=0.0))
+        for i, state in enumerate(inputs):
+            with ledger.request(f"job {i}"):
+                state = {**state, "resume_summary": llm.invoke(summary_prompt(state)).content}
+                llm.invoke(letter_prompt(state))
+        rows = ledger.rows()
+        input_tokens = sum(row["input tokens"] for row in rows)
+        cacheable = sum(row["cacheable"] for row in rows)
+        totals.append({
+            "layout": layout,
+            "input tokens/request": input_tokens / count,
+            "cacheable/request": cacheable / count,
+            "fresh/request": (input_tokens - cacheable) / count,
+            "cacheable %": f"{cacheable / input_tokens:.0%}",
+        })
+    print_table(f"Prompt chain input tokens ({count} job descriptions of ~{description_words} words)", totals)
+    return totals
+
+
+if __name__ == "__main__":
+    benchmark()
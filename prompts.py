@@ -0,0 +1,96 @@
+# prompts.py
+
+
+def job_prefix(state: dict) -> str:
+    """The part shared by both prompts; it comes first so the two requests start with the same bytes."""
+    return f"""
+Job Description:
+{state['job_description']}
+"""
+
+
+def resume_summary_prompt(state: dict) -> str:
+    return job_prefix(state) + """
+You're a resume assistant. Read the job description above and summarize the key qualifications and experience the ideal candidate should have, phrased as if from the perspective of a strong applicant's resume summary.
+"""
+
+
+def cover_letter_prompt(state: dict) -> str:
+    return job_prefix(state) + f"""
+Resume Summary:
+{state['resume_summary']}
+
+You're a cover letter writing assistant. Using the resume summary above, write a professional and personalized cover letter for the job described above.
+"""
+
+
+# Instructions of the multi-service handlers; the request follows them, see `service_prompt`.
+SERVICE_INSTRUCTIONS = {
+    "ride_hailing_call": """You are a ride hailing assistant. Based on the user's request below, extract and organize the following information:
+
+- Pickup location
+- Destination/dropoff location
+- Preferred ride type (if mentioned)
+- Any special requirements
+- Estimated timing preferences
+
+Provide a clear summary of the ride request with all available details.""",
+    "restaurant_order": """You are a restaurant ordering assistant. Based on the user's request below, organize the following information:
+
+- Menu items requested
+- Quantities for each item
+- Special modifications or dietary restrictions
+- Delivery or pickup preference
+- Any timing requirements
+
+Provide a clear, organized summary of the restaurant order with all details.""",
+    "groceries": """You are a grocery delivery assistant for a service where our drivers pick up groceries for customers.
+
+Based on the user's request below, organize the following information:
+
+Shopping List:
+- List of grocery items needed
+- Quantities or amounts for each item
+- Brand preferences (if mentioned)
+- Any dietary restrictions or organic preferences
+
+Store Information:
+- Preferred store or location
+- Budget considerations
+- Special instructions for finding items
+
+Delivery Details:
+- Delivery address (if provided)
+- Preferred delivery time window
+- Any special delivery instructions
+- Contact information for driver coordination
+
+Driver Instructions:
+- Substitution preferences (if item unavailable)
+- How to handle out-of-stock items
+- Any items requiring special handling (fragile, cold items)
+- Payment method (if mentioned)
+
+Provide a comprehensive delivery order summary that our driver can use to efficiently shop and deliver groceries.
+Include estimated pickup time and any special notes for the shopping trip.
+
+Format the response as a clear, organized delivery order that includes all necessary details for our driver service.""",
+    "default_handler": """I couldn't classify the request below into a specific category.
+Let me provide general assistance for it.
+
+I can help you with:
+- Ride hailing services
+- Restaurant orders
+- Grocery shopping
+
+Please rephrase your request to match one of these services, or if you need assistance with something else, I will connect you with our customer support team who can provide personalized help.
+
+Would you like me to:
+1. Help you rephrase your request for one of our services
+2. Connect you with customer support for additional assistance""",
+}
+
+
+def service_prompt(role, user_input):
+    """Returns the prompt of the `role` handler: its instructions first, then the user's request."""
+    return f'{SERVICE_INSTRUCTIONS[role]}\n\nUser Request: "{user_input}"\n'
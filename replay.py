@@ -0,0 +1,339 @@
+# replay.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from bench import percentile, print_table, run_async
+from llm_cache import AIMessage, _render_prompt
+from stub_llm import StubChatModel, StubMessage
+
+
+class ReplayMiss(KeyError):
+    """Raised by a strict `ReplayChatModel` for a request that is not in the fixture."""
+
+
+def _tool_names(tools):
+    names = []
+    for tool in tools or []:
+        if isinstance(tool, dict):
+            names.append(tool.get("function", {}).get("name") or tool.get("name"))
+        else:
+            names.append(getattr(tool, "__name__", None) or getattr(tool, "name", None) or str(tool))
+    return names
+
+
+def _bound_tools(llm):
+    kwargs = getattr(llm, "kwargs", None)
+    return kwargs.get("tools") if isinstance(kwargs, dict) else getattr(llm, "tools", None)
+
+
+def request_key(tools, prompt):
+    """Hashes the bound tool names and the rendered prompt, which is all the replay model can see."""
+    payload = json.dumps([_tool_names(tools), _render_prompt(prompt)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Recorder:
+    """
+    Captures every request/response pair of a run into a JSON lines fixture.
+
+    Wrap each model (`llm`, and `llm_router` if it was bound before wrapping)
+    with `wrap_llm`; every call is appended to `path` as it completes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+
+    def wrap_llm(self, llm):
+        return RecordingChatModel(llm, self)
+
+    def record(self, llm, prompt, message):
+        tools = _bound_tools(llm)
+        entry = {
+            "key": request_key(tools, prompt),
+            "tools": _tool_names(tools),
+            "prompt": _render_prompt(prompt),
+            "content": message.content,
+            "tool_calls": list(getattr(message, "tool_calls", None) or []),
+            "usage_metadata": getattr(message, "usage_metadata", None),
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+            self.calls += 1
+        return message
+
+
+class RecordingChatModel:
+    """Wraps a live chat model and writes each call to a `Recorder`."""
+
+    def __init__(self, llm, recorder):
+        self.llm = llm
+        self.recorder = recorder
+
+    def invoke(self, prompt, config=None, **kwargs):
+        return self.recorder.record(self.llm, prompt, self.llm.invoke(prompt, config, **kwargs))
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        return self.recorder.record(self.llm, prompt, await self.llm.ainvoke(prompt, config, **kwargs))
+
+    def stream(self, prompt, config=None, **kwargs):
+        message = None
+        for chunk in self.llm.stream(prompt, config, **kwargs):
+            message = chunk if message is None else message + chunk
+            yield chunk
+        self.recorder.record(self.llm, prompt, message)
+
+    async def astream(self, prompt, config=None, **kwargs):
+        message = None
+        async for chunk in self.llm.astream(prompt, config, **kwargs):
+            message = chunk if message is None else message + chunk
+            yield chunk
+        self.recorder.record(self.llm, prompt, message)
+
+    def bind_tools(self, tools, **kwargs):
+        return RecordingChatModel(self.llm.bind_tools(tools, **kwargs), self.recorder)
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def load_fixture(path):
+    """Reads a recorded fixture into {key: [responses in recording order]}."""
+    responses = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                responses.setdefault(entry["key"], []).append(entry)
+    return responses
+
+
+class ReplayChatModel(StubChatModel):
+    """
+    Offline fake model that answers from a recorded fixture.
+
+    Requests are matched on their rendered prompt and bound tool names. When
+    a request was recorded several times its responses are served in turn.
+    `latency`, `jitter` and `token_latency` add the same synthetic delays as
+    `StubChatModel`, seeded so runs are repeatable. A request missing from
+    the fixture raises `ReplayMiss` unless `strict=False`, in which case the
+    stub reply is used. `stream` and `astream` yield the recorded message as
+    a single chunk, so tool calls and usage survive `StreamingChatModel`.
+    """
+
+    def __init__(self, fixture, latency=0.0, jitter=0.0, seed=0, token_latency=0.0, strict=True):
+        super().__init__(latency, jitter, seed=seed, token_latency=token_latency)
+        self.responses = load_fixture(fixture) if isinstance(fixture, (str, os.PathLike)) else fixture
+        self.strict = strict
+        self.misses = 0
+        self._served = {}
+
+    def _respond(self, prompt):
+        self.calls += 1
+        key = request_key(self.tools, prompt)
+        entries = self.responses.get(key)
+        if not entries:
+            self.misses += 1
+            if self.strict:
+                raise ReplayMiss(f"no recorded response for {str(_render_prompt(prompt))[:80]!r}")
+            return StubChatModel._respond(self, prompt)
+        served = self._served.get(key, 0)
+        self._served[key] = served + 1
+        entry = entries[served % len(entries)]
+        if AIMessage is not None:
+            return AIMessage(content=entry["content"], tool_calls=entry["tool_calls"], usage_metadata=entry["usage_metadata"])
+        return StubMessage(entry["content"], entry["tool_calls"], entry["usage_metadata"])
+
+    def _stream_delay(self, message):
+        return self.token_latency * max(len(message.content.split(" ")) - 1, 0)
+
+    def stream(self, prompt, config=None, **kwargs):
+        time.sleep(self._delay())
+        message = self._respond(prompt)
+        time.sleep(self._stream_delay(message))
+        yield message
+
+    async def astream(self, prompt, config=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        message = self._respond(prompt)
+        await asyncio.sleep(self._stream_delay(message))
+        yield message
+
+    def bind_tools(self, tools, **kwargs):
+        bound = ReplayChatModel(self.responses, self.latency, self.jitter, token_latency=self.token_latency, strict=self.strict)
+        bound.tools = list(tools)
+        bound._random = self._random
+        bound._served = self._served
+        return bound
+
+
+def measure_throughput(app, inputs, runs=3):
+    """
+    Invokes `app` on every input `runs` times and returns runs/s and latency percentiles.
+
+    Runs go through `ainvoke` so that graphs with async nodes, such as the
+    parallel translation graph, are measured the same way as the others.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(runs):
+        for state in inputs:
+            began = time.perf_counter()
+            run_async(app.ainvoke(state))
+            latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    return {
+        "runs": len(latencies),
+        "runs/s": len(latencies) / elapsed,
+        "p50 ms": 1000 * percentile(latencies, 50),
+        "p95 ms": 1000 * percentile(latencies, 95),
+    }
+
+
+def _build(app):
+    return app if hasattr(app, "ainvoke") else app()
+
+
+def round_trip(workflows, install, fixture="replay_round_trip.jsonl", record_with=None, latency=0.0):
+    """
+    Records `workflows` once, replays them from the fixture and checks that every run ends in the same state.
+
+    `workflows` maps a name to `(app, inputs)`, where `app` may also be a
+    function that builds the graph, for graphs that capture their model when
+    they are built. `install(model)` makes the workflows' nodes use `model`;
+    in the notebook it rebinds the `llm` and `llm_router` globals.
+    `record_with` is the live model to record from; by default a
+    `StubChatModel` that routes on keywords stands in for it. A request the
+    replay cannot answer raises `ReplayMiss` and a run that ends in a
+    different state raises AssertionError. Returns the recorder and the
+    replay model, with its synthetic `latency`, which is left installed.
+    """
+    if os.path.exists(fixture):
+        os.remove(fixture)
+    recorder = Recorder(fixture)
+    install(recorder.wrap_llm(record_with or _stub_live_model()))
+    recorded = {name: [run_async(_build(app).ainvoke(state)) for state in inputs]
+                for name, (app, inputs) in workflows.items()}
+
+    replay = ReplayChatModel(fixture, latency=latency, strict=True)
+    install(replay)
+    for name, (app, inputs) in workflows.items():
+        app = _build(app)
+        for state, expected in zip(inputs, recorded[name]):
+            replayed = run_async(app.ainvoke(state))
+            assert replayed == expected, f"{name}: replay of {state!r} ended in {replayed!r}, recorded {expected!r}"
+    return recorder, replay
+
+
+def _stub_live_model():
+    routes = {"Summarize": "summarize", "Translate": "translate", "ride": "ride_hailing_call",
+              "pizzas": "restaurant_order", "milk": "groceries"}
+    return StubChatModel(latency=0.0, tool_calls=lambda prompt: [{
+        "name": "Router", "id": "stub", "type": "tool_call",
+        "args": {"role": next((r for word, r in routes.items() if word in prompt), "default_handler")},
+    }])
+
+
+def _workflows():
+    """
+    Stand-ins for the chain, routing, parallel and multi-service workflows of the notebook.
+
+    Returns the workflows and their `install` function. They are used only
+    when the module runs on its own; the notebook passes its own graphs.
+    """
+    from typing import TypedDict
+
+    from langgraph.graph import StateGraph
+
+    from prompts import SERVICE_INSTRUCTIONS, cover_letter_prompt, resume_summary_prompt, service_prompt
+    from parallel_translation import build_parallel_graph
+
+    models = {}
+
+    class ChainState(TypedDict):
+        job_description: str
+        resume_summary: str
+        cover_letter: str
+
+    class RouterState(TypedDict):
+        user_input: str
+        task_type: str
+        output: str
+
+    chain = StateGraph(ChainState)
+    chain.add_node("generate_resume_summary",
+                   lambda state: {"resume_summary": models["llm"].invoke(resume_summary_prompt(state)).content})
+    chain.add_node("generate_cover_letter",
+                   lambda state: {"cover_letter": models["llm"].invoke(cover_letter_prompt(state)).content})
+    chain.set_entry_point("generate_resume_summary")
+    chain.add_edge("generate_resume_summary", "generate_cover_letter")
+    chain.set_finish_point("generate_cover_letter")
+
+    def handler_prompt(route, user_input):
+        if route in SERVICE_INSTRUCTIONS:
+            return service_prompt(route, user_input)
+        return f'Answer the request: {route}.\n\nUser Request: "{user_input}"\n'
+
+    def build_router(routes):
+        workflow = StateGraph(RouterState)
+
+        def router_node(state):
+            response = models["llm"].bind_tools(["Router"]).invoke(state["user_input"])
+            return {"task_type": response.tool_calls[0]["args"]["role"] if response.tool_calls else routes[-1]}
+
+        workflow.add_node("router", router_node)
+        for route in routes:
+            workflow.add_node(route, lambda state, route=route: {
+                "output": models["llm"].invoke(handler_prompt(route, state["user_input"])).content})
+            workflow.set_finish_point(route)
+        workflow.set_entry_point("router")
+        workflow.add_conditional_edges("router", lambda state: state["task_type"], {route: route for route in routes})
+        return workflow.compile()
+
+    workflows = {
+        "chain": (chain.compile(), [{"job_description": "Data scientist with Python, NLP and MLOps experience."}]),
+        "routing": (build_router(["summarize", "translate"]), [
+            {"user_input": "Summarize: LangGraph builds stateful workflows from nodes and edges."},
+            {"user_input": "Translate to French: good morning"},
+        ]),
+        "parallel": (lambda: build_parallel_graph(models["llm"], max_concurrency=None), [{"text": "Good morning, how are you?"}]),
+        "multi-service": (build_router(["ride_hailing_call", "restaurant_order", "groceries", "default_handler"]), [
+            {"user_input": "I need a ride from downtown to the airport at 3pm"},
+            {"user_input": "I want to order 2 large pepperoni pizzas for delivery"},
+            {"user_input": "I need milk, bread, eggs, and vegetables for the week"},
+            {"user_input": "What's the weather like today?"},
+        ]),
+    }
+    return workflows, lambda model: models.update(llm=model)
+
+
+def benchmark(workflows=None, install=None, fixture="replay_benchmark.jsonl", latency=0.0, runs=5, record_with=None):
+    """
+    Records the workflows once, checks that they replay, then replays them offline and reports throughput.
+
+    `workflows` and `install` are as for `round_trip`; without them the
+    module's stand-ins for the notebook's workflows are used. `record_with`
+    is the live model to record from, by default a `StubChatModel`, so the
+    benchmark needs no API key. With `latency=0` the numbers measure the
+    graph machinery alone.
+    """
+    if workflows is None:
+        workflows, install = _workflows()
+    recorder, replay = round_trip(workflows, install, fixture, record_with, latency)
+    rows = [{"workflow": name, **measure_throughput(_build(app), inputs, runs)} for name, (app, inputs) in workflows.items()]
+    os.remove(fixture)
+    print_table(f"Offline replay of {recorder.calls} recorded calls (synthetic latency {latency}s, misses {replay.misses})", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
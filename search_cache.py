@@ -0,0 +1,341 @@
+# search_cache.py
+import contextvars
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from search_client import get_client
+
+SERPER_URL = "https://google.serper.dev/search"
+
+# (class, pattern, ttl, stale window) in seconds; the first class whose pattern matches the query wins.
+QUERY_CLASSES = [
+    ("news", r"\b(news|latest|today|breaking|this week|recent|current)\b", 3600, 3 * 3600),
+    ("prices", r"\b(price|prices|cost|costs|deal|deals|discount|cheap|budget)\b", 6 * 3600, 24 * 3600),
+    ("general", r"", 7 * 24 * 3600, 7 * 24 * 3600),
+]
+
+# Set by batch runners to count the searches made on behalf of one topic.
+search_counter = contextvars.ContextVar("search_counter", default=None)
+
+
+def normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+
+def search_key(query, **params):
+    """Builds the cache key of a search: the normalized query plus the parameters that change its results."""
+    return json.dumps([normalize_query(query), {k: v for k, v in sorted(params.items()) if v is not None}])
+
+
+def fetch_serper(query, url=SERPER_URL, api_key=None, n_results=10, timeout=30, client=None):
+    """Sends one search to the Serper API (or a compatible stub) through the shared `SearchClient`."""
+    return (client or get_client()).post_json(url, {"q": query, "num": n_results}, api_key=api_key, timeout=timeout)
+
+
+class SearchCache:
+    """
+    Thread-safe in-memory cache of search results shared by every tool and topic.
+
+    `get_or_fetch(key, fetch)` returns the cached result or calls `fetch()`.
+    When several threads ask for the same missing key at once, only the first
+    one fetches it and the others wait for its result.
+    """
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _count(self, kind):
+        counter = search_counter.get()
+        if counter is not None:
+            counter[kind] = counter.get(kind, 0) + 1
+
+    def get_or_fetch(self, key, fetch):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._count("hits")
+                return self._entries[key]
+            waiter, owner = self._join(key)
+        return self._fetch_once(key, fetch, waiter, owner)
+
+    def _join(self, key):
+        """Registers interest in fetching `key`; call with the lock held. Returns (waiter, owner)."""
+        waiter = self._in_flight.get(key)
+        if waiter is None:
+            waiter = self._in_flight[key] = {"done": threading.Event()}
+            self.misses += 1
+            return waiter, True
+        self.coalesced += 1
+        return waiter, False
+
+    def _fetch_once(self, key, fetch, waiter, owner):
+        if not owner:
+            self._count("hits")
+            waiter["done"].wait()
+            if "error" in waiter:
+                raise waiter["error"]
+            return waiter["result"]
+
+        self._count("fetches")
+        try:
+            result = fetch()
+        except Exception as error:
+            waiter["error"] = error
+            raise
+        else:
+            waiter["result"] = result
+            self._store(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            waiter["done"].set()
+
+    def _store(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "lookups": lookups,
+            "fetches": self.misses,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+class PersistentSearchCache(SearchCache):
+    """
+    Search cache kept in a SQLite file, so results survive between runs and processes.
+
+    Each query is put in the first matching class of `classes`, which sets how
+    long its results stay fresh (`ttl`) and for how much longer they may be
+    served stale. A fresh result is returned as is. A stale one is returned
+    at once while a single background refresh fetches the new result
+    (stale-while-revalidate). Results older than both are fetched again
+    before returning. `class_stats()` reports hit rates per class.
+    """
+
+    def __init__(self, path="search_cache.sqlite", classes=QUERY_CLASSES, max_entries=100_000, refresh_workers=2,
+                 clock=time.time):
+        super().__init__(max_entries=max_entries)
+        self.path = path
+        self.classes = [(name, re.compile(pattern), ttl, stale_for) for name, pattern, ttl, stale_for in classes]
+        self.clock = clock
+        self.counters = {name: {"fresh_hits": 0, "stale_hits": 0, "misses": 0} for name, *_ in self.classes}
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self._refreshing = {}
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS searches "
+            "(key TEXT PRIMARY KEY, query_class TEXT NOT NULL, result TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def classify(self, key):
+        """Returns (class, ttl, stale window) for a key built by `search_key`."""
+        try:
+            query = json.loads(key)[0]
+        except (ValueError, TypeError, IndexError, KeyError):
+            query = key
+        for name, pattern, ttl, stale_for in self.classes:
+            if pattern.search(query):
+                return name, ttl, stale_for
+        return self.classes[-1][0], self.classes[-1][2], self.classes[-1][3]
+
+    def get_or_fetch(self, key, fetch):
+        query_class, ttl, stale_for = self.classify(key)
+        with self._lock:
+            row = self._db.execute("SELECT result, fetched_at FROM searches WHERE key = ?", (key,)).fetchone()
+            age = self.clock() - row[1] if row is not None else None
+            if age is not None and age <= ttl + stale_for:
+                stale = age > ttl
+                self.counters[query_class]["stale_hits" if stale else "fresh_hits"] += 1
+                self.hits += 1
+                self._count("hits")
+                if stale and key not in self._refreshing:
+                    self._refreshing[key] = self._refresher.submit(self._refresh, key, fetch)
+                return json.loads(row[0])
+            self.counters[query_class]["misses"] += 1
+            waiter, owner = self._join(key)
+        return self._fetch_once(key, fetch, waiter, owner)
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+            with self._lock:
+                self.refreshes += 1
+        except Exception:
+            # The stale result stays in place and the next lookup tries again.
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def _store(self, key, result):
+        query_class = self.classify(key)[0]
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+                (key, query_class, json.dumps(result, default=str), self.clock()),
+            )
+            (count,) = self._db.execute("SELECT COUNT(*) FROM searches").fetchone()
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM searches WHERE key IN (SELECT key FROM searches ORDER BY fetched_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._db.commit()
+
+    def wait_for_refreshes(self):
+        """Blocks until the background refreshes started so far have finished."""
+        with self._lock:
+            pending = list(self._refreshing.values())
+        for future in pending:
+            future.result()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM searches")
+            self._db.commit()
+
+    def close(self):
+        self._refresher.shutdown(wait=True)
+        self._db.close()
+
+    def class_stats(self):
+        rows = []
+        for name, counts in self.counters.items():
+            lookups = sum(counts.values())
+            hits = counts["fresh_hits"] + counts["stale_hits"]
+            rows.append({"class": name, "lookups": lookups, **counts, "hit_rate": hits / lookups if lookups else 0.0})
+        return rows
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM searches").fetchone()
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "lookups": lookups,
+            "fetches": self.misses,
+            "stale_hits": sum(counts["stale_hits"] for counts in self.counters.values()),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+def make_cached_search_tool(cache, client=None, **kwargs):
+    """
+    Returns a `SerperDevTool` whose searches go through `cache`.
+
+    Give the same cache to the tools of every agent and crew copy so that a
+    query made for one topic is fetched only once. With a
+    `PersistentSearchCache` the results are also reused by later runs.
+    Searches that miss the cache are sent through `client`, by default the
+    process-wide `SearchClient` as it is at the time of the search, so all
+    tools share its connections and rate limit. The client is plugged in by
+    overriding `SerperDevTool._make_api_request`; a crewai_tools version
+    without that method raises RuntimeError rather than bypassing it.
+    """
+    from crewai_tools import SerperDevTool
+    from pydantic import PrivateAttr
+
+    if not callable(getattr(SerperDevTool, "_make_api_request", None)):
+        raise RuntimeError("this crewai_tools version of SerperDevTool has no _make_api_request, "
+                           "so its searches cannot be sent through the shared SearchClient")
+
+    class CachedSerperDevTool(SerperDevTool):
+        _cache: SearchCache = PrivateAttr(default=None)
+        _client: object = PrivateAttr(default=None)
+
+        def _make_api_request(self, search_query, search_type):
+            payload = {"q": search_query, "num": self.n_results}
+            for field, name in (("country", "gl"), ("location", "location"), ("locale", "hl")):
+                if getattr(self, field, None):
+                    payload[name] = getattr(self, field)
+            url = self._get_search_url(search_type) if hasattr(self, "_get_search_url") else SERPER_URL
+            results = (self._client or get_client()).post_json(url, payload, api_key=os.environ.get("SERPER_API_KEY"))
+            if not results:
+                raise ValueError("Empty response from Serper API")
+            return results
+
+        def _run(self, **kwargs):
+            query = kwargs.get("search_query") or kwargs.get("query")
+            # Arguments passed with the call override the tool's own settings, so they decide the key.
+            params = {name: kwargs.get(name, getattr(self, name, None))
+                      for name in ("n_results", "search_type", "country", "location", "locale")}
+            key = search_key(query, n=params["n_results"], type=params["search_type"], country=params["country"],
+                             location=params["location"], locale=params["locale"])
+            return self._cache.get_or_fetch(key, lambda: super(CachedSerperDevTool, self)._run(**kwargs))
+
+    tool = CachedSerperDevTool(**kwargs)
+    tool._cache = cache
+    tool._client = client
+    return tool
+
+
+def benchmark(queries=30, search_latency=0.05, path="search_cache_benchmark.sqlite"):
+    """
+    Runs the same searches three times through a `PersistentSearchCache` against the stub Serper server.
+
+    The second run opens the cache file afresh, as a new process would. The
+    third run is two hours later, when the news results are stale: they are
+    served at once and refreshed in the background.
+    """
+    from bench import print_table
+    from stub_search import StubSearchServer
+
+    topics = [f"topic {i}" for i in range(queries // 3)]
+    searches = [f"latest {t} news" for t in topics] + [f"{t} prices" for t in topics] + [f"what is {t}" for t in topics]
+    if os.path.exists(path):
+        os.remove(path)
+    rows = []
+    with StubSearchServer(latency=search_latency) as server:
+        for run, offset in (("cold", 0), ("new process", 0), ("2 hours later", 2 * 3600)):
+            cache = PersistentSearchCache(path, clock=lambda offset=offset: time.time() + offset)
+            before = server.requests
+            start = time.perf_counter()
+            for query in searches:
+                cache.get_or_fetch(search_key(query), lambda query=query: fetch_serper(query, url=server.url))
+            elapsed = time.perf_counter() - start
+            cache.wait_for_refreshes()
+            stats = cache.stats()
+            rows.append({
+                "run": run,
+                "lookups": stats["lookups"],
+                "fetched": stats["fetches"],
+                "stale served": stats["stale_hits"],
+                "refreshed": stats["refreshes"],
+                "server requests": server.requests - before,
+                "ms/lookup": 1000 * elapsed / len(searches),
+            })
+            cache.close()
+    os.remove(path)
+    print_table(f"Persistent search cache ({len(searches)} searches, stub search {search_latency}s)", rows)
+    print_table("Hit rate per query class, last run", cache.class_stats())
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
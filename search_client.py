@@ -0,0 +1,235 @@
+# search_client.py
+import os
+import random
+import threading
+import time
+
+from bench import print_table
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until it is available; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class SearchClient:
+    """
+    Pooled HTTP client shared by every search tool in the process.
+
+    Requests reuse keep-alive connections from one `httpx.Client`, which
+    speaks HTTP/2 when the `h2` package is installed and the server supports
+    it. Each API key gets its own token bucket of `rate` requests per second,
+    so parallel agents stay under the provider's limit instead of being
+    rejected; set it to the limit of your plan. Responses with a status in
+    `RETRY_STATUSES` and connection errors are retried up to `retries` times
+    with jittered exponential backoff, honouring `Retry-After` when the
+    server sends one.
+    """
+
+    def __init__(self, rate=50.0, burst=50, max_connections=20, http2=None, retries=3, backoff=0.5, max_backoff=8.0,
+                 timeout=30):
+        self.rate = rate
+        self.burst = burst
+        self.max_connections = max_connections
+        self.http2 = http2
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.counters = {"requests": 0, "retries": 0, "errors": 0, "throttled_s": 0.0}
+        self._buckets = {}
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+
+            http2 = self.http2
+            if http2 is None:
+                try:
+                    import h2  # noqa: F401
+                    http2 = True
+                except ImportError:
+                    http2 = False
+            with self._lock:
+                if self._client is None:
+                    limits = httpx.Limits(max_connections=self.max_connections,
+                                          max_keepalive_connections=self.max_connections)
+                    self._client = httpx.Client(limits=limits, timeout=self.timeout, http2=http2)
+        return self._client
+
+    def _bucket(self, api_key):
+        with self._lock:
+            if api_key not in self._buckets:
+                self._buckets[api_key] = TokenBucket(self.rate, self.burst)
+            return self._buckets[api_key]
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def post_json(self, url, payload, api_key=None, api_key_header="X-API-KEY", timeout=None):
+        """POSTs `payload` as JSON and returns the decoded JSON response."""
+        import httpx
+
+        api_key = api_key or os.environ.get("SERPER_API_KEY", "")
+        headers = {api_key_header: api_key, "Content-Type": "application/json"}
+        bucket = self._bucket(api_key)
+        for attempt in range(self.retries + 1):
+            waited = bucket.acquire()
+            response = None
+            with self._lock:
+                self.counters["requests"] += 1
+                self.counters["throttled_s"] += waited
+            try:
+                response = self.client.post(url, json=payload, headers=headers, timeout=timeout or self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    with self._lock:
+                        self.counters["errors"] += 1
+                    raise
+            if attempt == self.retries:
+                with self._lock:
+                    self.counters["errors"] += 1
+                response.raise_for_status()
+            with self._lock:
+                self.counters["retries"] += 1
+            time.sleep(self._delay(attempt, response))
+
+    def stats(self):
+        return dict(self.counters)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_client(**kwargs):
+    """
+    Returns the process-wide `SearchClient`, creating it with `kwargs` on first use.
+
+    Once the client exists, `kwargs` that differ from its settings raise
+    ValueError instead of being ignored; use `configure_client` to change them.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SearchClient(**kwargs)
+        differing = {k: v for k, v in kwargs.items() if getattr(_shared, k) != v}
+        if differing:
+            raise ValueError(f"the shared search client already exists with other settings (requested {differing}); "
+                             "call configure_client() to replace it")
+        return _shared
+
+
+def configure_client(**kwargs):
+    """
+    Replaces the process-wide `SearchClient` with one created with `kwargs` and returns it.
+
+    Tools built by `search_cache.make_cached_search_tool` without an explicit
+    client look the shared client up on every request, so they use the new
+    one from their next search on. The old client's connections are closed.
+    """
+    global _shared
+    with _shared_lock:
+        previous, _shared = _shared, SearchClient(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _shared
+
+
+def _fetch_unpooled(url, payload):
+    """One request on a new connection, as the search tools do without a shared client."""
+    import json
+    import urllib.request
+
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def benchmark(requests=200, threads=8, latency=0.01, handshake=0.03, rate=50.0):
+    """
+    Measures requests/s and connection reuse against the stub Serper server.
+
+    The stub spends `handshake` seconds on each new connection, about what a
+    TLS handshake with a remote API costs. The benchmark compares a new
+    connection per request with the pooled client, then runs the pooled
+    client with a `rate` limit and against a server that answers every
+    fifth request with 429 to show throttling and retries.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from stub_search import StubSearchServer
+
+    def run(mode, fetch, count, fail_every=0, client=None):
+        with StubSearchServer(latency=latency, fail_every=fail_every, handshake=handshake) as server:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(lambda i: fetch(server.url, {"q": f"query {i}", "num": 10}), range(count)))
+            elapsed = time.perf_counter() - start
+            stats = client.stats() if client is not None else {}
+            if client is not None:
+                client.close()
+            return {
+                "mode": mode,
+                "requests": count,
+                "wall s": elapsed,
+                "requests/s": count / elapsed,
+                "connections": server.connections,
+                "requests/connection": server.requests / server.connections if server.connections else 0.0,
+                "retries": stats.get("retries", 0),
+                "throttled s": stats.get("throttled_s", 0.0),
+            }
+
+    pooled = SearchClient(rate=1e9, burst=threads, max_connections=threads)
+    limited = SearchClient(rate=rate, burst=threads, max_connections=threads)
+    retrying = SearchClient(rate=1e9, burst=threads, max_connections=threads, backoff=0.01)
+    rows = [
+        run("new connection per request", _fetch_unpooled, requests),
+        run("pooled client", pooled.post_json, requests, client=pooled),
+        run(f"pooled, {rate:g} requests/s limit", limited.post_json, requests // 2, client=limited),
+        run("pooled, every 5th answered 429", retrying.post_json, requests, fail_every=5, client=retrying),
+    ]
+    print_table(f"Search HTTP client ({threads} threads, stub latency {latency}s, handshake {handshake}s)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,211 @@
+# semantic_router.py
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+
+from bench import percentile, print_table
+from embedder_identity import embedder_identity
+from fast_router import RouterMetrics
+
+
+class SentenceTransformerEmbedder:
+    """Embeds text locally with a sentence-transformers model, loaded on first use."""
+
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+        self.model_name = model_name
+        self._model = None
+
+    def embed(self, text):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    def embed_batch(self, texts):
+        return self.embed(list(texts))
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder that hashes word unigrams and bigrams into a fixed-size vector.
+
+    It only captures lexical overlap, but it needs no model download, which
+    makes it useful for benchmarks and offline runs.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def embed(self, text):
+        tokens = re.findall(r"[a-z0-9']+", text.lower())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticRouteCache:
+    """
+    In-process vector index of previously routed utterances.
+
+    `lookup` returns the route of the most similar cached utterance when its
+    cosine similarity reaches `threshold`. Once `max_entries` utterances are
+    stored, new ones replace the least recently used. When `path` is given
+    the index is loaded from it on start and written back by `save`, together
+    with each entry's recency and the embedding model and dimension, so an
+    index built with another embedder is refused instead of searched.
+    """
+
+    def __init__(self, embedder, threshold=0.9, max_entries=10_000, path=None):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.vectors = None
+        self.routes = []
+        self.utterances = []
+        self.last_used = np.zeros(max_entries, dtype=np.float64)
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def _check_dim(self, vector):
+        if self.vectors is not None and vector.shape[0] != self.vectors.shape[1]:
+            raise ValueError(f"the embedder returns {vector.shape[0]}-dimensional vectors but the index holds "
+                             f"{self.vectors.shape[1]}-dimensional ones")
+
+    def lookup(self, text):
+        """Returns `(route, similarity, query_vector)`; the route is None on a miss."""
+        query = self.embedder.embed(text)
+        self._check_dim(query)
+        if not self.routes:
+            return None, 0.0, query
+        similarities = self.vectors[: len(self.routes)] @ query
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            return None, similarity, query
+        self.last_used[best] = time.monotonic()
+        return self.routes[best], similarity, query
+
+    def add(self, text, route, vector=None):
+        vector = self.embedder.embed(text) if vector is None else vector
+        self._check_dim(vector)
+        if self.vectors is None:
+            self.vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        if len(self.routes) < self.max_entries:
+            slot = len(self.routes)
+            self.routes.append(route)
+            self.utterances.append(text)
+        else:
+            slot = int(np.argmin(self.last_used))
+            self.routes[slot] = route
+            self.utterances[slot] = text
+        self.vectors[slot] = vector
+        self.last_used[slot] = time.monotonic()
+
+    def save(self, path=None):
+        path = path or self.path
+        count = len(self.routes)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            vectors=self.vectors[:count] if count else np.zeros((0, 0), dtype=np.float32),
+            routes=np.array(self.routes, dtype=str),
+            utterances=np.array(self.utterances, dtype=str),
+            # The monotonic clock restarts with the process, so recency is stored as each entry's age.
+            ages=time.monotonic() - self.last_used[:count],
+            model=np.array(embedder_identity(self.embedder)),
+            dim=np.array(self.vectors.shape[1] if count else 0),
+        )
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Loads an index written by `save`; raises ValueError if it was built with another embedder."""
+        model = embedder_identity(self.embedder)
+        with np.load(path) as data:
+            if "model" not in data or str(data["model"]) != model:
+                stored = str(data["model"]) if "model" in data else "an unknown model"
+                raise ValueError(f"{path} was built with {stored}, not {model}; delete it to rebuild")
+            vectors, routes, utterances = data["vectors"], data["routes"].tolist(), data["utterances"].tolist()
+            ages, dim = data["ages"], int(data["dim"])
+        if routes and dim != getattr(self.embedder, "dim", dim):
+            raise ValueError(f"{path} holds {dim}-dimensional vectors but the embedder returns {self.embedder.dim}")
+        # Keep the most recently used entries when the file holds more than fit.
+        order = np.argsort(ages, kind="stable")[: self.max_entries]
+        keep = len(order)
+        self.routes, self.utterances = [routes[i] for i in order], [utterances[i] for i in order]
+        if keep:
+            self.vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+            self.vectors[:keep] = vectors[order]
+        self.last_used[:keep] = time.monotonic() - ages[order]
+
+
+def make_semantic_router_node(cache, llm_router_node, metrics=None):
+    """
+    Puts a `SemanticRouteCache` in front of an existing LLM router node.
+
+    Hits reuse the cached route; misses call `llm_router_node` and add the
+    utterance with its route to the index. Cache hits are counted as
+    fast-path hits in the `RouterMetrics`.
+    """
+    metrics = metrics if metrics is not None else RouterMetrics()
+
+    def semantic_router_node(state):
+        start = time.perf_counter()
+        route, _, vector = cache.lookup(state["user_input"])
+        metrics.fast_time += time.perf_counter() - start
+        if route is not None:
+            metrics.fast_hits += 1
+            return {"task_type": route}
+        start = time.perf_counter()
+        result = llm_router_node(state)
+        metrics.llm_time += time.perf_counter() - start
+        metrics.fallbacks += 1
+        cache.add(state["user_input"], result["task_type"], vector)
+        return result
+
+    semantic_router_node.metrics = metrics
+    return semantic_router_node
+
+
+def benchmark(cached=10_000, queries=500, embedder=None):
+    """Measures lookup latency and insertion cost with `cached` utterances in the index."""
+    embedder = embedder or HashingEmbedder()
+    routes = ["ride_hailing_call", "restaurant_order", "groceries", "default_handler"]
+    places = ["airport", "downtown", "station", "office", "stadium", "hotel", "mall", "harbor"]
+    cache = SemanticRouteCache(embedder, threshold=0.9, max_entries=cached)
+
+    start = time.perf_counter()
+    for i in range(cached):
+        cache.add(f"get me a cab from {places[i % 8]} number {i} to {places[(i // 8) % 8]}", routes[i % 4])
+    fill_time = time.perf_counter() - start
+
+    lookups, embeds = [], []
+    for i in range(queries):
+        text = f"get me a cab from {places[i % 8]} number {i * 7 % cached} to {places[(i // 8) % 8]}"
+        start = time.perf_counter()
+        embedder.embed(text)
+        embeds.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        cache.lookup(text)
+        lookups.append(time.perf_counter() - start)
+
+    print_table(f"Semantic route cache with {len(cache)} utterances", [
+        {"step": "embed query", "p50 ms": 1000 * percentile(embeds, 50), "p95 ms": 1000 * percentile(embeds, 95)},
+        {"step": "embed + search", "p50 ms": 1000 * percentile(lookups, 50), "p95 ms": 1000 * percentile(lookups, 95)},
+        {"step": "insert (mean)", "p50 ms": 1000 * fill_time / cached, "p95 ms": "-"},
+    ])
+    return lookups
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,291 @@
+# speculative.py
+import contextvars
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import percentile, print_table
+from streaming import HeldWriter, _stream_writer, held_stream
+
+_speculation = contextvars.ContextVar("speculation", default=None)
+
+
+class SpeculationCancelled(RuntimeError):
+    """Raised inside an abandoned speculative handler when it tries to make another model call."""
+
+
+class RoutePrior:
+    """
+    Cheap local guess of a request's route, used to pick the handler to start early.
+
+    With a `FastPathRouter` the guess comes from its keyword and similarity
+    scores; when it has no opinion, or without one, the most frequent route
+    seen so far is used with its historical share as the confidence.
+    """
+
+    def __init__(self, fast_router=None):
+        self.fast_router = fast_router
+        self.counts = Counter()
+
+    def predict(self, text):
+        if self.fast_router is not None:
+            route, confidence = self.fast_router.classify(text)
+            if route is not None:
+                return route, confidence
+        if not self.counts:
+            return None, 0.0
+        route, count = self.counts.most_common(1)[0]
+        return route, count / sum(self.counts.values())
+
+    def observe(self, route):
+        self.counts[route] += 1
+
+
+class SpeculationAccounting:
+    """Tracks speculative hits and misses, the tokens wasted on misses and the time saved on hits."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.wasted_tokens = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def wrap_llm(self, llm):
+        return SpeculativeChatModel(llm)
+
+    def record_skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def record_hit(self, saved_seconds):
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += saved_seconds
+
+    def record_miss(self, wasted_tokens=0):
+        with self._lock:
+            self.misses += 1
+            self.wasted_tokens += wasted_tokens
+
+    def record_waste(self, tokens):
+        """Adds the tokens an abandoned handler spent after its miss was recorded."""
+        with self._lock:
+            self.wasted_tokens += tokens
+
+    def summary(self):
+        started = self.hits + self.misses
+        return {
+            "requests": started + self.skipped,
+            "speculated": started,
+            "hit_rate": self.hits / started if started else 0.0,
+            "wasted_tokens": self.wasted_tokens,
+            "seconds_saved": self.saved_seconds,
+        }
+
+
+class SpeculativeChatModel:
+    """
+    Wraps the handlers' chat model so calls made by a speculative handler are metered.
+
+    Usage is added to the running speculation; once the speculation has been
+    abandoned, further calls raise `SpeculationCancelled` instead of reaching
+    the provider. Streamed tokens are held back until the route is confirmed.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    @staticmethod
+    def _check():
+        speculation = _speculation.get()
+        if speculation is not None and speculation["cancelled"]:
+            raise SpeculationCancelled("route changed; speculative handler abandoned")
+        return speculation
+
+    @staticmethod
+    def _meter(speculation, response):
+        if speculation is not None:
+            usage = getattr(response, "usage_metadata", None) or {}
+            speculation["tokens"] += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        return response
+
+    def invoke(self, prompt, config=None, **kwargs):
+        speculation = self._check()
+        return self._meter(speculation, self.llm.invoke(prompt, config, **kwargs))
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        speculation = self._check()
+        return self._meter(speculation, await self.llm.ainvoke(prompt, config, **kwargs))
+
+    def bind_tools(self, tools, **kwargs):
+        return SpeculativeChatModel(self.llm.bind_tools(tools, **kwargs))
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def _run_speculation(speculation, handler, state):
+    token = _speculation.set(speculation)
+    start = time.perf_counter()
+    try:
+        # Tokens of a handler that may still turn out to be wrong must not reach the client yet.
+        with held_stream(speculation["stream"]):
+            return handler(state)
+    finally:
+        speculation["elapsed"] = time.perf_counter() - start
+        _speculation.reset(token)
+
+
+def make_speculative_router_node(router_node, handlers, prior, min_confidence=0.5, accounting=None, max_workers=8):
+    """
+    Starts the most likely handler while `router_node` is still classifying the request.
+
+    When `prior` guesses a route with confidence of at least `min_confidence`,
+    that handler runs in a worker thread concurrently with `router_node`. If
+    the router agrees, the handler's result is returned together with the
+    route and `speculative_route` ends the run; otherwise the speculation is
+    abandoned, its tokens are counted as wasted and the graph runs the right
+    handler as usual. A speculative handler that raises counts as a miss too,
+    and the graph runs the handler again normally. Raising `min_confidence`
+    trades saved latency for fewer wasted tokens. The node's `close()` shuts
+    down its worker threads.
+    """
+    accounting = accounting if accounting is not None else SpeculationAccounting()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def speculative_router_node(state):
+        guess, confidence = prior.predict(state["user_input"])
+        if guess not in handlers or confidence < min_confidence:
+            accounting.record_skip()
+            result = router_node(state)
+            prior.observe(result["task_type"])
+            return {**result, "output": ""}
+
+        speculation = {"tokens": 0, "cancelled": False, "stream": HeldWriter()}
+        start = time.perf_counter()
+        context = contextvars.copy_context()
+        future = executor.submit(context.run, _run_speculation, speculation, handlers[guess], state)
+        result = router_node(state)
+        routed = time.perf_counter() - start
+        prior.observe(result["task_type"])
+        if result["task_type"] == guess:
+            speculation["stream"].release(_stream_writer())
+            try:
+                handled = future.result()
+            except Exception:
+                # The routed handler runs again normally, and raises there if the failure was not transient.
+                accounting.record_miss(speculation["tokens"])
+                return {**result, "output": ""}
+            # Run one after the other, the two calls would have taken routed + elapsed.
+            accounting.record_hit(min(routed, speculation["elapsed"]))
+            return {**result, **handled, "task_type": guess}
+        speculation["cancelled"] = True
+        if not future.cancel():
+            future.add_done_callback(lambda f: accounting.record_waste(speculation["tokens"]))
+        accounting.record_miss()
+        return {**result, "output": ""}
+
+    speculative_router_node.accounting = accounting
+    speculative_router_node.prior = prior
+    speculative_router_node.close = lambda: executor.shutdown(wait=False, cancel_futures=True)
+    return speculative_router_node
+
+
+def speculative_route(state):
+    """Ends the run when the speculative handler's answer was kept, otherwise routes as usual."""
+    return "__end__" if state.get("output") else state["task_type"]
+
+
+def benchmark(requests=40, latency=0.1, thresholds=(0.0, 0.5, 0.8, None)):
+    """
+    Sweeps `min_confidence` on the multi-service router with stub models.
+
+    The prior is the keyword and similarity fast-path router, so requests it
+    misreads start the wrong handler. `None` turns speculation off.
+    """
+    from typing import TypedDict
+
+    from langgraph.graph import StateGraph
+
+    from fast_router import SERVICE_EXAMPLES, SERVICE_KEYWORDS, FastPathRouter
+    from stub_llm import StubChatModel
+
+    class RouterState(TypedDict):
+        user_input: str
+        task_type: str
+        output: str
+
+    labelled = {
+        "I need a ride from downtown to the airport at 3pm": "ride_hailing_call",
+        "Get me a cab to the stadium": "ride_hailing_call",
+        "I want to order 2 large pepperoni pizzas for delivery": "restaurant_order",
+        "Order sushi takeout for four people": "restaurant_order",
+        "I need milk, bread, eggs, and vegetables for the week": "groceries",
+        "Pick up some fruit and yogurt from the supermarket": "groceries",
+        "Bring the milk I forgot at the restaurant to my place": "ride_hailing_call",
+        "What's the weather like today?": "default_handler",
+    }
+    routes = sorted(set(labelled.values()))
+    rows = []
+    for threshold in thresholds:
+        llm_router = StubChatModel(
+            latency=latency,
+            tool_calls=lambda prompt: [{"name": "Router", "args": {"role": labelled[prompt]}, "id": "stub"}],
+        ).bind_tools(["Router"])
+        accounting = SpeculationAccounting()
+        llm = accounting.wrap_llm(StubChatModel(latency=latency))
+
+        def router_node(state):
+            return {"task_type": llm_router.invoke(state["user_input"]).tool_calls[0]["args"]["role"]}
+
+        def make_handler(route):
+            def handler(state):
+                return {"output": llm.invoke(f"As the {route} assistant, answer: {state['user_input']}").content}
+            return handler
+
+        handlers = {route: make_handler(route) for route in routes}
+        workflow = StateGraph(RouterState)
+        if threshold is None:
+            workflow.add_node("router", router_node)
+            workflow.add_conditional_edges("router", lambda state: state["task_type"], {r: r for r in routes})
+        else:
+            prior = RoutePrior(FastPathRouter(SERVICE_KEYWORDS, SERVICE_EXAMPLES))
+            speculative_router_node = make_speculative_router_node(router_node, handlers, prior, threshold, accounting)
+            workflow.add_node("router", speculative_router_node)
+            workflow.add_conditional_edges("router", speculative_route, {**{r: r for r in routes}, "__end__": "__end__"})
+        for route in routes:
+            workflow.add_node(route, handlers[route])
+            workflow.set_finish_point(route)
+        workflow.set_entry_point("router")
+        app = workflow.compile()
+
+        latencies = []
+        inputs = list(labelled) * (requests // len(labelled))
+        for text in inputs:
+            start = time.perf_counter()
+            app.invoke({"user_input": text})
+            latencies.append(time.perf_counter() - start)
+        time.sleep(2 * latency)  # let abandoned handlers finish so their tokens are counted
+        if threshold is not None:
+            speculative_router_node.close()
+        summary = accounting.summary()
+        rows.append({
+            "min confidence": "off" if threshold is None else threshold,
+            "p50 ms": 1000 * percentile(latencies, 50),
+            "p95 ms": 1000 * percentile(latencies, 95),
+            "speculated": summary["speculated"],
+            "hit rate": f"{summary['hit_rate']:.0%}",
+            "wasted tokens/request": summary["wasted_tokens"] / len(inputs),
+            "saved ms/request": 1000 * summary["seconds_saved"] / len(inputs),
+        })
+    print_table(f"Speculative handlers ({requests} requests, stub latency {latency}s per call)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,176 @@
+# state_updates.py
+import time
+import tracemalloc
+from typing import TypedDict
+
+from bench import print_table
+
+
+def make_state_type(keys):
+    """Builds a TypedDict with `keys` string fields named field_0 ... field_{keys-1}."""
+    return TypedDict(f"State{keys}", {f"field_{i}": str for i in range(keys)})
+
+
+def make_initial_state(keys, value_size=1000):
+    return {f"field_{i}": "x" * value_size for i in range(keys)}
+
+
+def copy_node(state: dict) -> dict:
+    """Returns the whole state with one field changed, as the original workflow nodes did."""
+    return {**state, "field_0": "updated"}
+
+
+def delta_node(state: dict) -> dict:
+    """Returns only the field that changed."""
+    return {"field_0": "updated"}
+
+
+def measure_node(node, state, calls=2000):
+    """Returns mean seconds and mean bytes allocated per call of `node`."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        node(state)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = [node(state) for _ in range(100)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del results
+    return elapsed / calls, allocated / 100
+
+
+def build_chain(state_type, node, hops):
+    from langgraph.graph import StateGraph
+
+    graph = StateGraph(state_type)
+    for hop in range(hops):
+        graph.add_node(f"hop_{hop}", node)
+        if hop:
+            graph.add_edge(f"hop_{hop - 1}", f"hop_{hop}")
+    graph.set_entry_point("hop_0")
+    graph.set_finish_point(f"hop_{hops - 1}")
+    return graph.compile()
+
+
+def measure_graph(state_type, node, state, hops=10, runs=20):
+    """Returns mean seconds and peak bytes allocated per hop of a `hops`-node LangGraph chain."""
+    app = build_chain(state_type, node, hops)
+    app.invoke(state)
+    start = time.perf_counter()
+    for _ in range(runs):
+        app.invoke(state)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    app.invoke(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed / (runs * hops), peak / hops
+
+
+def build_workflows(llm, style="delta"):
+    """
+    Builds the notebook's prompt chain and multi-service router around `llm`.
+
+    With `style="delta"` every node returns only the keys it changes, as
+    the notebook's nodes do; with `style="copy"` it returns `{**state, ...}`,
+    as they did before. The state fields keep LangGraph's default
+    last-value channel, which is the right reducer for these scalar fields.
+    """
+    from langgraph.graph import StateGraph
+
+    from prompts import cover_letter_prompt, resume_summary_prompt, service_prompt
+
+    class ChainState(TypedDict):
+        job_description: str
+        resume_summary: str
+        cover_letter: str
+
+    class RouterState(TypedDict):
+        user_input: str
+        task_type: str
+        output: str
+
+    def update(state, **changes):
+        return {**state, **changes} if style == "copy" else changes
+
+    chain = StateGraph(ChainState)
+    chain.add_node("generate_resume_summary",
+                   lambda state: update(state, resume_summary=llm.invoke(resume_summary_prompt(state)).content))
+    chain.add_node("generate_cover_letter",
+                   lambda state: update(state, cover_letter=llm.invoke(cover_letter_prompt(state)).content))
+    chain.set_entry_point("generate_resume_summary")
+    chain.add_edge("generate_resume_summary", "generate_cover_letter")
+    chain.set_finish_point("generate_cover_letter")
+
+    llm_router = llm.bind_tools(["Router"])
+    roles = ["ride_hailing_call", "restaurant_order", "groceries", "default_handler"]
+    router = StateGraph(RouterState)
+
+    def router_node(state):
+        response = llm_router.invoke(state["user_input"])
+        return update(state, task_type=response.tool_calls[0]["args"]["role"] if response.tool_calls else "default_handler")
+
+    router.add_node("router", router_node)
+    for role in roles:
+        router.add_node(role, lambda state, role=role: update(
+            state, task_type=role, output=llm.invoke(service_prompt(role, state["user_input"])).content.strip()))
+        router.set_finish_point(role)
+    router.set_entry_point("router")
+    router.add_conditional_edges("router", lambda state: state["task_type"], {role: role for role in roles})
+    return {"chain": chain.compile(), "router": router.compile()}
+
+
+def benchmark_workflows(runs=200, description_words=1500):
+    """
+    Compares delta and full-copy nodes in the notebook's chain and router graphs on a zero-latency stub model.
+
+    The chain gets a job description of `description_words` words; reports
+    microseconds and peak bytes allocated per run.
+    """
+    from stub_llm import StubChatModel
+
+    llm = StubChatModel(latency=0.0, tool_calls=lambda prompt: [{"name": "Router", "id": "stub", "args": {"role": "groceries"}}])
+    inputs = {
+        "chain": {"job_description": " ".join(["python"] * description_words)},
+        "router": {"user_input": "I need milk, bread, eggs, and vegetables for the week"},
+    }
+    rows = []
+    for style in ("copy", "delta"):
+        for name, app in build_workflows(llm, style).items():
+            app.invoke(inputs[name])
+            start = time.perf_counter()
+            for _ in range(runs):
+                app.invoke(inputs[name])
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            app.invoke(inputs[name])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows.append({"graph": name, "nodes return": style, "us/run": elapsed / runs * 1e6, "peak bytes/run": peak})
+    rows.sort(key=lambda row: row["graph"])
+    print_table(f"Notebook graphs with delta and full-copy nodes ({runs} runs, stub model)", rows)
+    return rows
+
+
+def benchmark(key_counts=(10, 100, 1000), hops=10, include_graph=True):
+    """Compares full-copy and delta-only node returns for states with 10 to 1000 keys, then in the notebook's graphs."""
+    rows = []
+    for keys in key_counts:
+        state = make_initial_state(keys)
+        for name, node in (("copy", copy_node), ("delta", delta_node)):
+            seconds, allocated = measure_node(node, state)
+            row = {"keys": keys, "node": name, "node us": seconds * 1e6, "node bytes": int(allocated)}
+            if include_graph:
+                hop_seconds, hop_bytes = measure_graph(make_state_type(keys), node, state, hops)
+                row.update({"graph hop us": hop_seconds * 1e6, "graph peak bytes/hop": int(hop_bytes)})
+            rows.append(row)
+    print_table(f"Per-hop cost of node state updates ({hops}-hop chain)", rows)
+    benchmark_workflows()
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,162 @@
+# streaming.py
+import contextlib
+import contextvars
+import threading
+import time
+
+from bench import percentile, print_table
+
+_held_writer = contextvars.ContextVar("streaming_held_writer", default=None)
+
+
+class HeldWriter:
+    """
+    Stream writer that buffers events until `release` hands it the real writer.
+
+    After `release` the buffered events are written in order and later ones
+    pass straight through; if it is never released the events are dropped.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._write = None
+        self._lock = threading.Lock()
+
+    def __call__(self, chunk):
+        with self._lock:
+            if self._write is None:
+                self._events.append(chunk)
+                return
+            write = self._write
+        write(chunk)
+
+    def release(self, write):
+        with self._lock:
+            for chunk in self._events:
+                write(chunk)
+            self._events = []
+            self._write = write
+
+
+@contextlib.contextmanager
+def held_stream(writer):
+    """Sends the stream events of `StreamingChatModel` calls made inside the block to `writer` instead."""
+    token = _held_writer.set(writer)
+    try:
+        yield writer
+    finally:
+        _held_writer.reset(token)
+
+
+def _stream_writer():
+    """Returns LangGraph's custom stream writer, or a no-op outside a graph run."""
+    held = _held_writer.get()
+    if held is not None:
+        return held
+    try:
+        from langgraph.config import get_stream_writer
+
+        return get_stream_writer()
+    except (ImportError, RuntimeError):
+        return lambda chunk: None
+
+
+class StreamingChatModel:
+    """
+    Wraps a chat model so `invoke` streams the completion token by token.
+
+    Inside a LangGraph node each chunk is emitted as a custom stream event
+    `{"token": ...}`, followed by `{"ttft": seconds}` once the first token
+    arrives, so `app.stream(..., stream_mode="custom")` sees the tokens as
+    they are generated. `invoke` still returns the complete message, which
+    keeps the node's `output` field unchanged.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.ttfts = []
+
+    def invoke(self, prompt, config=None, **kwargs):
+        write = _stream_writer()
+        start = time.perf_counter()
+        message = None
+        for chunk in self.llm.stream(prompt, config, **kwargs):
+            if message is None:
+                ttft = time.perf_counter() - start
+                self.ttfts.append(ttft)
+                write({"ttft": ttft})
+                message = chunk
+            else:
+                message = message + chunk
+            if chunk.content:
+                write({"token": chunk.content})
+        return message
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        write = _stream_writer()
+        start = time.perf_counter()
+        message = None
+        async for chunk in self.llm.astream(prompt, config, **kwargs):
+            if message is None:
+                ttft = time.perf_counter() - start
+                self.ttfts.append(ttft)
+                write({"ttft": ttft})
+                message = chunk
+            else:
+                message = message + chunk
+            if chunk.content:
+                write({"token": chunk.content})
+        return message
+
+    def bind_tools(self, tools, **kwargs):
+        bound = StreamingChatModel(self.llm.bind_tools(tools, **kwargs))
+        bound.ttfts = self.ttfts
+        return bound
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def stream_output(app, inputs, on_token=None):
+    """
+    Runs `app` in streaming mode and passes each handler token to `on_token`.
+
+    Returns `(final_state, ttft)` where `ttft` is the time from the start of
+    the run until the first token reached the caller.
+    """
+    on_token = on_token or (lambda token: print(token, end="", flush=True))
+    start = time.perf_counter()
+    ttft = None
+    final_state = None
+    for mode, chunk in app.stream(inputs, stream_mode=["custom", "values"]):
+        if mode == "values":
+            final_state = chunk
+        elif "token" in chunk:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            on_token(chunk["token"])
+    return final_state, ttft
+
+
+def benchmark(requests=10, latency=0.3, token_latency=0.02):
+    """Compares time-to-first-token with the full completion time for a stub handler."""
+    from stub_llm import StubChatModel
+
+    reply = lambda prompt: " ".join(["token"] * 40)
+    streaming = StreamingChatModel(StubChatModel(latency=latency, reply=reply, token_latency=token_latency))
+    totals = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        streaming.invoke("Provide a clear summary of the ride request with all available details.")
+        totals.append(time.perf_counter() - start)
+    print_table(f"Streaming handler over {requests} requests", [
+        {"metric": "time to first token", "p50 s": percentile(streaming.ttfts, 50), "p95 s": percentile(streaming.ttfts, 95)},
+        {"metric": "full completion", "p50 s": percentile(totals, 50), "p95 s": percentile(totals, 95)},
+    ])
+    return streaming.ttfts, totals
+
+
+if __name__ == "__main__":
+    benchmark()
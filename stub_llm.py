@@ -0,0 +1,102 @@
+# stub_llm.py
+import asyncio
+import random
+import time
+
+
+class StubMessage:
+    """Minimal stand-in for the AIMessage returned by ChatOpenAI."""
+
+    def __init__(self, content, tool_calls=None, usage_metadata=None, response_metadata=None):
+        self.content = content
+        self.tool_calls = tool_calls or []
+        self.usage_metadata = usage_metadata
+        self.response_metadata = response_metadata or {}
+
+    def __add__(self, other):
+        return StubMessage(self.content + other.content, self.tool_calls + other.tool_calls,
+                           other.usage_metadata or self.usage_metadata)
+
+
+class StubChatModel:
+    """
+    Local stand-in for ChatOpenAI that answers after an injected delay.
+
+    `latency` is the base delay in seconds and `jitter` adds a uniform random
+    extra delay on top, so benchmarks can exercise the graph machinery without
+    a network connection or API key. `tool_calls` is an optional callable
+    mapping a prompt to the tool calls returned once tools are bound.
+    `token_latency` is the delay between streamed chunks after the first.
+    Like ChatOpenAI, streaming puts the tool calls on the first chunk and the
+    usage on the last one.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, reply=None, tool_calls=None, seed=0, token_latency=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.reply = reply or (lambda prompt: f"[stub] {prompt.strip()[-60:]}")
+        self.tool_calls = tool_calls
+        self.tools = []
+        self.tool_choice = None
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def _delay(self):
+        return self.latency + self._random.uniform(0, self.jitter)
+
+    def _respond(self, prompt):
+        self.calls += 1
+        prompt = str(prompt)
+        if self.tools and self.tool_calls and self.tool_choice != "none":
+            content, tool_calls = "", self.tool_calls(prompt)
+        else:
+            content, tool_calls = self.reply(prompt), None
+        # Roughly four characters per token, like the usage reported by ChatOpenAI.
+        usage = {"input_tokens": len(prompt) // 4 + 1, "output_tokens": len(content) // 4 + 1}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return StubMessage(content, tool_calls, usage)
+
+    def bind_tools(self, tools, **kwargs):
+        bound = StubChatModel(self.latency, self.jitter, self.reply, self.tool_calls, token_latency=self.token_latency)
+        bound.tools = list(tools)
+        bound.tool_choice = kwargs.get("tool_choice")
+        bound._random = self._random
+        return bound
+
+    def invoke(self, prompt, config=None, **kwargs):
+        time.sleep(self._delay())
+        return self._respond(prompt)
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        return self._respond(prompt)
+
+    def batch(self, prompts, config=None, **kwargs):
+        # A batch request pays a single round-trip, bounded by its slowest item.
+        prompts = list(prompts)
+        time.sleep(max((self._delay() for _ in prompts), default=0))
+        return [self._respond(prompt) for prompt in prompts]
+
+    async def abatch(self, prompts, config=None, **kwargs):
+        return await asyncio.gather(*(self.ainvoke(prompt) for prompt in prompts))
+
+    def _chunks(self, message):
+        tokens = message.content.split(" ")
+        for i, token in enumerate(tokens):
+            yield StubMessage(token if i == 0 else " " + token, message.tool_calls if i == 0 else None,
+                              message.usage_metadata if i == len(tokens) - 1 else None)
+
+    def stream(self, prompt, config=None, **kwargs):
+        time.sleep(self._delay())
+        for i, chunk in enumerate(self._chunks(self._respond(prompt))):
+            if i:
+                time.sleep(self.token_latency)
+            yield chunk
+
+    async def astream(self, prompt, config=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        for i, chunk in enumerate(self._chunks(self._respond(prompt))):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield chunk
@@ -0,0 +1,102 @@
+# stub_search.py
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubSearchServer:
+    """
+    Local stand-in for the Serper search API.
+
+    `POST /search` with a JSON body `{"q": ..., "num": ...}` answers after
+    `latency` seconds with Serper-shaped results, so search tools and caches
+    can be benchmarked without an API key. `requests` counts the searches
+    that reached the server and `connections` the TCP connections opened
+    for them. `handshake` seconds are spent on every new connection, standing
+    in for the TCP and TLS setup of a remote API. With `fail_every=n`, every
+    n-th request is answered with `429 Too Many Requests` instead.
+    """
+
+    def __init__(self, latency=0.05, host="127.0.0.1", port=0, fail_every=0, handshake=0.0):
+        self.latency = latency
+        self.handshake = handshake
+        self.fail_every = fail_every
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body are separate writes on kept-alive connections
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+                time.sleep(server.handshake)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    rejected = server.fail_every and server.requests % server.fail_every == 0
+                time.sleep(server.latency)
+                if rejected:
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                data = json.dumps(server.results(body.get("q", ""), int(body.get("num", 10)))).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 128  # the default backlog of 5 drops connections opened by parallel agents
+
+        self._server = Server((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    @staticmethod
+    def results(query, count=10):
+        return {
+            "searchParameters": {"q": query, "type": "search", "num": count},
+            "organic": [
+                {
+                    "title": f"{query} - result {i + 1}",
+                    "link": f"https://example.com/{'-'.join(query.lower().split())}/{i + 1}",
+                    "snippet": f"Snippet {i + 1} about {query}.",
+                    "position": i + 1,
+                }
+                for i in range(count)
+            ],
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
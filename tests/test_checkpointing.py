@@ -0,0 +1,13 @@
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+from checkpointing import crash_injection_check  # noqa: E402
+
+
+def test_resume_after_handler_crash_reuses_routed_state():
+    assert crash_injection_check() == {"router": 1, "handler": 2}
+
+
+def test_resume_from_sqlite_file(tmp_path):
+    assert crash_injection_check(str(tmp_path / "checkpoints.sqlite")) == {"router": 1, "handler": 2}
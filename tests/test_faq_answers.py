@@ -0,0 +1,57 @@
+import pytest
+
+from faq_answers import AnswerCache
+from semantic_router import HashingEmbedder
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "answers.sqlite")
+
+
+def open_cache(path, version="faq-v1", embedder=None):
+    return AnswerCache(embedder or HashingEmbedder(), version=version, path=path, threshold=0.8)
+
+
+def test_approved_answers_survive_reopening(path):
+    cache = open_cache(path)
+    cache.store("What are the timings?", "9 to 5", approved=True)
+    cache.close()
+    cache = open_cache(path)
+    assert cache.lookup("what are the timings") == ("9 to 5", "exact", 1.0)
+    assert cache.stats()["invalidated"] == 0
+    cache.close()
+
+
+def test_new_faq_version_invalidates_answers(path):
+    cache = open_cache(path)
+    cache.store("What are the timings?", "9 to 5", approved=True)
+    cache.store("Do you have vegan options?", "Yes")
+    cache.close()
+    cache = open_cache(path, version="faq-v2")
+    assert cache.stats()["invalidated"] == 2
+    assert cache.lookup("What are the timings?")[0] is None
+    cache.close()
+
+
+def test_new_embedder_invalidates_answers(path):
+    cache = open_cache(path)
+    cache.store("What are the timings?", "9 to 5", approved=True)
+    cache.close()
+    cache = open_cache(path, embedder=HashingEmbedder(dim=128))
+    assert cache.stats()["invalidated"] == 1
+    # A reworded question is compared with 128-dimensional vectors only, not the old 384-dimensional ones.
+    assert cache.lookup("what are your timings?")[0] is None
+    cache.store("What are the timings?", "10 to 6", approved=True)
+    assert cache.lookup("What are the timings?")[0] == "10 to 6"
+    cache.close()
+
+
+def test_pending_answers_are_not_served(path):
+    cache = open_cache(path)
+    cache.store("What are the timings?", "9 to 5")
+    assert cache.lookup("What are the timings?")[0] is None
+    assert cache.pending() == [("What are the timings?", "9 to 5")]
+    cache.approve("What are the timings?")
+    assert cache.lookup("What are the timings?")[0] == "9 to 5"
+    cache.close()
@@ -0,0 +1,93 @@
+import pytest
+
+from search_cache import PersistentSearchCache, search_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = PersistentSearchCache(str(tmp_path / "searches.sqlite"), clock=clock)
+    yield cache
+    cache.close()
+
+
+def fetcher(results):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"organic": [results[len(calls) - 1]]}
+
+    fetch.calls = calls
+    return fetch
+
+
+def test_search_key_normalizes_query_and_drops_unset_params():
+    assert search_key("  Latest AI   News ") == search_key("latest ai news")
+    assert search_key("ai", n=10, country=None) == search_key("ai", n=10)
+
+
+def test_search_key_separates_parameters_that_change_results():
+    assert search_key("ai", type="news") != search_key("ai", type="search")
+    assert search_key("ai", n=10) != search_key("ai", n=20)
+    assert search_key("ai", country="us") != search_key("ai", country="de")
+
+
+def test_queries_are_classified_by_ttl_class(cache):
+    assert cache.classify(search_key("latest ai news"))[0] == "news"
+    assert cache.classify(search_key("gpu prices"))[0] == "prices"
+    assert cache.classify(search_key("what is langgraph"))[0] == "general"
+
+
+def test_fresh_result_is_served_without_fetching(cache, clock):
+    fetch = fetcher(["first", "second"])
+    key = search_key("latest ai news")
+    assert cache.get_or_fetch(key, fetch) == {"organic": ["first"]}
+    clock.now += 3600 - 1
+    assert cache.get_or_fetch(key, fetch) == {"organic": ["first"]}
+    assert len(fetch.calls) == 1
+
+
+def test_stale_result_is_served_then_refreshed(cache, clock):
+    fetch = fetcher(["first", "second"])
+    key = search_key("latest ai news")
+    cache.get_or_fetch(key, fetch)
+    clock.now += 2 * 3600
+    assert cache.get_or_fetch(key, fetch) == {"organic": ["first"]}
+    cache.wait_for_refreshes()
+    assert cache.get_or_fetch(key, fetch) == {"organic": ["second"]}
+    assert len(fetch.calls) == 2
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_expired_result_is_fetched_before_returning(cache, clock):
+    fetch = fetcher(["first", "second"])
+    key = search_key("latest ai news")
+    cache.get_or_fetch(key, fetch)
+    clock.now += 4 * 3600 + 1
+    assert cache.get_or_fetch(key, fetch) == {"organic": ["second"]}
+    assert len(fetch.calls) == 2
+
+
+def test_cached_tool_keys_on_per_call_search_type(cache, monkeypatch):
+    pytest.importorskip("crewai_tools")
+    from search_cache import make_cached_search_tool
+
+    tool = make_cached_search_tool(cache)
+    keys = []
+    monkeypatch.setattr(cache, "get_or_fetch", lambda key, fetch: keys.append(key))
+    tool._run(search_query="ai")
+    tool._run(search_query="ai", search_type="news")
+    assert keys[0] != keys[1]
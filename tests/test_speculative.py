@@ -0,0 +1,28 @@
+from speculative import RoutePrior, make_speculative_router_node
+
+
+def make_node(handler, route="groceries"):
+    prior = RoutePrior()
+    prior.observe(route)
+    return make_speculative_router_node(lambda state: {"task_type": route}, {route: handler}, prior, min_confidence=0.0)
+
+
+def test_hit_returns_the_speculative_answer():
+    node = make_node(lambda state: {"output": "milk"})
+    try:
+        assert node({"user_input": "buy milk"}) == {"task_type": "groceries", "output": "milk"}
+        assert node.accounting.hits == 1
+    finally:
+        node.close()
+
+
+def test_failed_speculation_falls_back_to_the_routed_handler():
+    def handler(state):
+        raise RuntimeError("provider error")
+
+    node = make_node(handler)
+    try:
+        assert node({"user_input": "buy milk"}) == {"task_type": "groceries", "output": ""}
+        assert (node.accounting.hits, node.accounting.misses) == (0, 1)
+    finally:
+        node.close()
@@ -0,0 +1,367 @@
+# tracing.py
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+from bench import print_table
+
+_current_run = contextvars.ContextVar("tracing_run", default=None)
+_current_span = contextvars.ContextVar("tracing_span", default=None)
+
+
+def _new_id(length):
+    return os.urandom(length // 2).hex()
+
+
+class Span:
+    """
+    Timing and usage recorded for one node execution, or for a whole run when it is the root.
+
+    Only `perf_counter` is read while the node runs. The span id and the
+    Unix timestamps are derived when the span is exported, from the run's
+    `epoch_ns`, which keeps the per-node cost off the hot path.
+    """
+
+    __slots__ = ("name", "trace_id", "parent_id", "epoch_ns", "start", "ready_at", "end", "prompt_tokens",
+                 "completion_tokens", "llm_calls", "cache_hits", "error", "_span_id")
+
+    def __init__(self, name, trace_id, parent_id=None, ready_at=None, epoch_ns=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        # Unix time in nanoseconds at perf_counter() == 0, shared by every span of a run.
+        self.epoch_ns = epoch_ns if epoch_ns is not None else time.time_ns() - int(self.start * 1e9)
+        self.ready_at = ready_at if ready_at is not None else self.start
+        self.end = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.error = None
+        self._span_id = None
+
+    @property
+    def span_id(self):
+        if self._span_id is None:
+            self._span_id = _new_id(16)
+        return self._span_id
+
+    @property
+    def start_ns(self):
+        return self.epoch_ns + int(self.start * 1e9)
+
+    @property
+    def end_ns(self):
+        return self.epoch_ns + int(self.end * 1e9)
+
+    @property
+    def wall_time(self):
+        return self.end - self.start
+
+    @property
+    def queue_wait(self):
+        return max(self.start - self.ready_at, 0.0)
+
+    def to_otel(self):
+        """Returns the span as an OTLP JSON `Span` object."""
+        attributes = {
+            "langgraph.node": self.name,
+            "node.queue_wait_ms": round(self.queue_wait * 1000, 3),
+            "llm.calls": self.llm_calls,
+            "llm.usage.prompt_tokens": self.prompt_tokens,
+            "llm.usage.completion_tokens": self.completion_tokens,
+            "llm.cache_hits": self.cache_hits,
+        }
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": value} if isinstance(value, str)
+                 else {"doubleValue": value} if isinstance(value, float) else {"intValue": str(value)}}
+                for key, value in attributes.items()
+            ],
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_OK"},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Run:
+    def __init__(self, name):
+        self.root = Span(name, _new_id(32))
+        self.spans = []
+        self.exported = False
+        self._ends = {}
+        self._lock = threading.Lock()
+
+    def start_span(self, name, predecessors=()):
+        """Starts a span that became ready when the latest of its `predecessors` finished, or at the run start."""
+        ends = self._ends
+        ready_at = max((ends[source] for source in predecessors if source in ends), default=self.root.start)
+        return Span(name, self.root.trace_id, self.root.span_id, ready_at, self.root.epoch_ns)
+
+    def finish_span(self, span):
+        span.end = time.perf_counter()
+        with self._lock:
+            self.spans.append(span)
+            self._ends[span.name] = span.end
+
+
+def predecessors(workflow, name):
+    """Returns the nodes of a `StateGraph` with an edge, a joined edge or a conditional edge into `name`."""
+    sources = {source for source, target in workflow.edges if target == name}
+    sources.update(source for starts, target in workflow.waiting_edges if target == name for source in starts)
+    sources.update(
+        source
+        for source, branches in workflow.branches.items()
+        for branch in branches.values()
+        if branch.ends is None or name in branch.ends.values()
+    )
+    return frozenset(sources)
+
+
+class NodeTracer:
+    """
+    Records per-node wall time, queue wait, token usage and cache hits for LangGraph runs.
+
+    Call `instrument(workflow)` right after creating a `StateGraph` so every
+    node registered with `add_node` is wrapped, wrap the model with
+    `wrap_llm` so its calls are attributed to the node that made them, and
+    run the compiled app through `invoke`/`ainvoke`. Queue wait is the time
+    between the end of the node's latest finished predecessor in the graph
+    and the start of the node, so parallel branches do not delay each other.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def instrument(self, workflow):
+        add_node = workflow.add_node
+
+        def traced_add_node(node, action=None, **kwargs):
+            if action is None:
+                node, action = getattr(node, "__name__", str(node)), node
+            # Edges are added after the nodes, so predecessors are looked up on the first call.
+            sources = functools.lru_cache(maxsize=None)(functools.partial(predecessors, workflow, node))
+            return add_node(node, self.wrap_node(node, action, sources), **kwargs)
+
+        workflow.add_node = traced_add_node
+        return workflow
+
+    def wrap_node(self, name, node, sources=frozenset):
+        """Wraps a node so it records a span; `sources` returns the names of the nodes that lead to it."""
+        if inspect.iscoroutinefunction(node):
+            @functools.wraps(node)
+            async def async_traced(state):
+                run = _current_run.get()
+                if run is None:
+                    return await node(state)
+                span = run.start_span(name, sources())
+                token = _current_span.set(span)
+                try:
+                    return await node(state)
+                except Exception as error:
+                    span.error = repr(error)
+                    raise
+                finally:
+                    _current_span.reset(token)
+                    run.finish_span(span)
+            return async_traced
+
+        @functools.wraps(node)
+        def traced(state):
+            run = _current_run.get()
+            if run is None:
+                return node(state)
+            span = run.start_span(name, sources())
+            token = _current_span.set(span)
+            try:
+                return node(state)
+            except Exception as error:
+                span.error = repr(error)
+                raise
+            finally:
+                _current_span.reset(token)
+                run.finish_span(span)
+        return traced
+
+    def wrap_llm(self, llm):
+        return TracedChatModel(llm)
+
+    def _start_run(self, name):
+        run = Run(name)
+        self.runs.append(run)
+        return run, _current_run.set(run)
+
+    def _finish_run(self, run, token):
+        _current_run.reset(token)
+        run.root.end = time.perf_counter()
+        for span in run.spans:
+            run.root.prompt_tokens += span.prompt_tokens
+            run.root.completion_tokens += span.completion_tokens
+            run.root.llm_calls += span.llm_calls
+            run.root.cache_hits += span.cache_hits
+
+    def invoke(self, app, inputs, config=None, name="run"):
+        run, token = self._start_run(name)
+        try:
+            return app.invoke(inputs, config)
+        finally:
+            self._finish_run(run, token)
+
+    async def ainvoke(self, app, inputs, config=None, name="run"):
+        run, token = self._start_run(name)
+        try:
+            return await app.ainvoke(inputs, config)
+        finally:
+            self._finish_run(run, token)
+
+    def export_jsonl(self, path, service_name="langgraph-workflow"):
+        """
+        Appends the runs finished since the last export to `path`, one OTLP JSON trace request per line.
+
+        Each line is an `ExportTraceServiceRequest` (`resourceSpans` ->
+        `scopeSpans` -> `spans`) holding the run's root span and its node
+        spans, the layout the OpenTelemetry Collector's file exporter writes
+        and its OTLP JSON file receiver reads. Returns the number of runs
+        written.
+        """
+        runs = [run for run in self.runs if not run.exported and run.root.end is not None]
+        resource = {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]}
+        with open(path, "a") as f:
+            for run in runs:
+                scope_spans = {"scope": {"name": "tracing"}, "spans": [span.to_otel() for span in [run.root, *run.spans]]}
+                f.write(json.dumps({"resourceSpans": [{"resource": resource, "scopeSpans": [scope_spans]}]}) + "\n")
+                run.exported = True
+        return len(runs)
+
+    def print_summary(self, run=None, width=30):
+        """Prints a flame-style table of one run (the latest by default): offset, duration and a bar per node."""
+        run = run or self.runs[-1]
+        total = run.root.end - run.root.start
+        rows = []
+        for span in sorted(run.spans, key=lambda s: s.start):
+            offset = span.start - run.root.start
+            lead = int(width * offset / total) if total else 0
+            bar = max(int(width * span.wall_time / total), 1) if total else 1
+            rows.append({
+                "node": span.name,
+                "start ms": 1000 * offset,
+                "wall ms": 1000 * span.wall_time,
+                "wait ms": 1000 * span.queue_wait,
+                "share": f"{span.wall_time / total:.0%}" if total else "-",
+                "tokens in/out": f"{span.prompt_tokens}/{span.completion_tokens}",
+                "cache hits": span.cache_hits,
+                "timeline": " " * lead + "#" * bar,
+            })
+        print_table(f"{run.root.name}: {1000 * total:.1f} ms, {run.root.prompt_tokens} prompt / "
+                    f"{run.root.completion_tokens} completion tokens", rows)
+
+
+class TracedChatModel:
+    """Wraps a chat model so each call's token usage and cache hits are added to the running node's span."""
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    @staticmethod
+    def _record(response):
+        span = _current_span.get()
+        if span is None:
+            return response
+        span.llm_calls += 1
+        if (getattr(response, "response_metadata", None) or {}).get("cache_hit"):
+            span.cache_hits += 1
+        else:
+            usage = getattr(response, "usage_metadata", None) or {}
+            span.prompt_tokens += usage.get("input_tokens", 0)
+            span.completion_tokens += usage.get("output_tokens", 0)
+        return response
+
+    def invoke(self, prompt, config=None, **kwargs):
+        return self._record(self.llm.invoke(prompt, config, **kwargs))
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        return self._record(await self.llm.ainvoke(prompt, config, **kwargs))
+
+    def bind_tools(self, tools, **kwargs):
+        return TracedChatModel(self.llm.bind_tools(tools, **kwargs))
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def benchmark(hops=10, runs=200, latency=0.05, model_runs=10):
+    """
+    Measures the tracing overhead per node, alone and against model latency.
+
+    The no-op chain isolates the cost of the wrappers, spans and context
+    variables. The model chain calls a `StubChatModel` with `latency` seconds
+    per node through `wrap_llm`, which is the share of a run that acceptance
+    is judged on: the same absolute cost per node, next to a model call.
+    """
+    from typing import TypedDict
+
+    from langgraph.graph import StateGraph
+
+    from stub_llm import StubChatModel
+
+    class State(TypedDict):
+        text: str
+
+    def build(make_node, tracer=None):
+        graph = StateGraph(State)
+        if tracer:
+            tracer.instrument(graph)
+        for hop in range(hops):
+            graph.add_node(f"hop_{hop}", make_node(tracer))
+            if hop:
+                graph.add_edge(f"hop_{hop - 1}", f"hop_{hop}")
+        graph.set_entry_point("hop_0")
+        graph.set_finish_point(f"hop_{hops - 1}")
+        return graph.compile()
+
+    def no_op(tracer):
+        return lambda state: {"text": state["text"]}
+
+    def model_call(tracer):
+        llm = StubChatModel(latency=latency, reply=lambda prompt: prompt)
+        if tracer:
+            llm = tracer.wrap_llm(llm)
+        return lambda state: {"text": llm.invoke(state["text"]).content}
+
+    def measure(app, invoke, count):
+        for _ in range(min(count, 10)):
+            invoke(app, {"text": "warm up"})
+        start = time.perf_counter()
+        for _ in range(count):
+            invoke(app, {"text": "hello"})
+        return (time.perf_counter() - start) / count
+
+    rows, per_node = [], None
+    for label, make_node, count in [("no-op", no_op, runs), (f"model {1000 * latency:.0f} ms", model_call, model_runs)]:
+        plain = measure(build(make_node), lambda app, inputs: app.invoke(inputs), count)
+        tracer = NodeTracer()
+        traced = measure(build(make_node, tracer), tracer.invoke, count)
+        overhead = (traced - plain) / hops
+        per_node = overhead if per_node is None else per_node
+        rows.append({"nodes": label, "runs": count, "plain ms/run": 1000 * plain, "traced ms/run": 1000 * traced,
+                     "overhead us/node": 1e6 * overhead, "overhead": f"{(traced - plain) / plain:.2%}"})
+    print_table(f"Tracing overhead ({hops}-node chain)", rows)
+    return per_node
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,250 @@
+# workflow_server.py
+import asyncio
+import json
+import time
+import uuid
+
+from bench import percentile, print_table, run_async
+
+
+class Overloaded(Exception):
+    """Raised when the request queue is full."""
+
+
+def make_pooled_llm(model="gpt-4o-mini", max_connections=100, max_keepalive=20, base_url=None, api_key=None):
+    """
+    Returns a ChatOpenAI instance whose async calls share one pooled HTTP client.
+
+    `base_url` and `api_key` default to ChatOpenAI's own settings; pass them
+    to point the model at another OpenAI-compatible endpoint.
+    """
+    import httpx
+    from langchain_openai import ChatOpenAI
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+    endpoint = {key: value for key, value in (("base_url", base_url), ("api_key", api_key)) if value is not None}
+    return ChatOpenAI(model=model, http_async_client=httpx.AsyncClient(limits=limits, timeout=60), **endpoint)
+
+
+def _sync_only_checkpointer(app):
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        return False
+    return isinstance(getattr(app, "checkpointer", None), SqliteSaver)
+
+
+class WorkflowServer:
+    """
+    Serves compiled LangGraph apps over a minimal asyncio HTTP/1.1 endpoint.
+
+    `POST /<name>` with a JSON body runs `apps[name].ainvoke(body)` and returns
+    the final state as JSON. Requests are placed on a bounded queue drained by
+    `workers` tasks; when the queue is full the server answers 503 instead of
+    accepting more work. Identical requests that arrive while one is still in
+    flight share its result instead of invoking the app again.
+
+    Apps compiled with a checkpointer get a fresh thread id per request, and
+    the checkpointer must support async calls (`InMemorySaver`,
+    `AsyncSqliteSaver`); the sync-only `SqliteSaver` is rejected up front.
+    """
+
+    def __init__(self, apps, workers=64, max_queue=256):
+        for name, app in apps.items():
+            if _sync_only_checkpointer(app):
+                raise ValueError(f"app {name!r} uses {type(app.checkpointer).__name__}, which cannot run under "
+                                 f"ainvoke; compile it without a checkpointer or with AsyncSqliteSaver")
+        self.apps = apps
+        self.workers = workers
+        self.max_queue = max_queue
+        self.stats = {"requests": 0, "coalesced": 0, "rejected": 0, "errors": 0}
+        self._queue = None
+        self._in_flight = {}
+        self._tasks = []
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8000):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def submit(self, name, inputs):
+        """Runs `inputs` through app `name`, joining an identical in-flight request if there is one."""
+        self.stats["requests"] += 1
+        key = (name, json.dumps(inputs, sort_keys=True))
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+        if self._queue.full():
+            self.stats["rejected"] += 1
+            raise Overloaded(f"queue is full ({self.max_queue} requests waiting)")
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self._queue.put_nowait((name, inputs, key, future))
+        return await asyncio.shield(future)
+
+    async def _worker(self):
+        while True:
+            name, inputs, key, future = await self._queue.get()
+            app = self.apps[name]
+            config = {"configurable": {"thread_id": uuid.uuid4().hex}} if getattr(app, "checkpointer", None) else None
+            try:
+                future.set_result(await app.ainvoke(inputs, config))
+            except Exception as error:
+                self.stats["errors"] += 1
+                future.set_exception(error)
+            finally:
+                self._in_flight.pop(key, None)
+                self._queue.task_done()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._dispatch(method, path.strip("/"), body)
+                data = json.dumps(payload, default=str).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, name, body):
+        if method != "POST" or name not in self.apps:
+            return "404 Not Found", {"error": f"unknown endpoint {method} /{name}"}
+        try:
+            inputs = json.loads(body or b"{}")
+        except ValueError as error:
+            return "400 Bad Request", {"error": f"invalid JSON body: {error}"}
+        try:
+            return "200 OK", await self.submit(name, inputs)
+        except Overloaded as error:
+            return "503 Service Unavailable", {"error": str(error)}
+        except Exception as error:
+            return "500 Internal Server Error", {"error": str(error)}
+
+
+def serve(apps, host="127.0.0.1", port=8000, **kwargs):
+    """Serves `apps` until the process is interrupted."""
+
+    async def main():
+        server = WorkflowServer(apps, **kwargs)
+        port_in_use = await server.start(host, port)
+        print(f"Serving {', '.join(f'POST /{name}' for name in apps)} on http://{host}:{port_in_use}")
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+async def _client(port, name, bodies, latencies, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for body in bodies:
+            data = json.dumps(body).encode("utf-8")
+            start = time.perf_counter()
+            writer.write(
+                f"POST /{name} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+            status = (await reader.readline()).split(b" ")[1].decode()
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load_test(server, name, make_body, concurrency, requests_per_client=20):
+    """Drives `server` with `concurrency` keep-alive clients and returns a result row."""
+    port = await server.start(port=0)
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(port, name, [make_body(c, i) for i in range(requests_per_client)], latencies, statuses)
+        for c in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    await server.stop()
+    return {
+        "clients": concurrency,
+        "requests": len(latencies),
+        "req/s": len(latencies) / elapsed,
+        "p50 ms": 1000 * percentile(latencies, 50),
+        "p95 ms": 1000 * percentile(latencies, 95),
+        "p99 ms": 1000 * percentile(latencies, 99),
+        "coalesced": server.stats["coalesced"],
+        "503s": statuses.get("503", 0),
+    }
+
+
+def benchmark(concurrency_levels=(1, 16, 128), latency=0.05, workers=64, max_queue=256, duplicate_every=4,
+              max_connections=100):
+    """
+    Load-tests the parallel translation app served with a stub model server behind it.
+
+    The app's model is `make_pooled_llm` pointed at a local `StubModelServer`,
+    so every translation goes over HTTP through the pooled client, and the
+    table reports how many TCP connections the model calls needed. Every
+    `duplicate_every`-th request repeats a shared text so that some identical
+    requests are coalesced.
+    """
+    from parallel_translation import build_parallel_graph
+    from stub_model_server import StubModelServer
+
+    def make_body(client, i):
+        if duplicate_every and i % duplicate_every == 0:
+            return {"text": f"Shared greeting {i}"}
+        return {"text": f"Good morning from client {client}, request {i}!"}
+
+    async def run(concurrency, base_url):
+        llm = make_pooled_llm(max_connections=max_connections, max_keepalive=max_connections,
+                              base_url=base_url, api_key="stub")
+        server = WorkflowServer({"translate": build_parallel_graph(llm)}, workers=workers, max_queue=max_queue)
+        try:
+            return await load_test(server, "translate", make_body, concurrency)
+        finally:
+            await llm.http_async_client.aclose()
+
+    rows = []
+    for concurrency in concurrency_levels:
+        with StubModelServer(latency=latency) as model_server:
+            row = run_async(run(concurrency, model_server.base_url))
+            row["model calls"] = model_server.requests
+            row["connections"] = model_server.connections
+            row["connections/call"] = model_server.connections / max(model_server.requests, 1)
+        rows.append(row)
+    print_table(f"Workflow server load test (stub model server latency {latency}s, {workers} workers, "
+                f"{max_connections} pooled connections)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()